@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import re
+from typing import Optional, Set
+
+from data_store import DATA_DIR
+
+# Pre-rendered audio guides written by build_audio.py; defaults to <data dir>/audio_cache
+AUDIO_DIR = os.getenv("DISHA_AUDIO_DIR", os.path.join(DATA_DIR, "audio_cache"))
+# Render settings of the cache, written by build_audio.py after every run
+INDEX_FILE = "index.json"
+
+MEDIA_TYPES = {"wav": "audio/wav", "mp3": "audio/mpeg", "ogg": "audio/ogg", "opus": "audio/ogg"}
+
+# Keys are 32 hex digits; anything else can't name a cached file
+_KEY = re.compile(r"[0-9a-f]{32}")
+
+
+def audio_key(engine: str, text: str) -> str:
+    """
+    Content address of the audio for text as rendered by engine (the TTS
+    command with its voice): a new script or voice gets a new file
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(engine.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def audio_path(directory: str, key: str, extension: str) -> str:
+    """
+    Where the file for key lives, fanned out by its first two hex digits
+    """
+    return os.path.join(directory, key[:2], f"{key}.{extension}")
+
+
+class AudioCache:
+    """
+    Read side of the content-addressed audio cache. Files never change once
+    written, so they can be cached by clients forever; a monument whose
+    audio_script changed simply has no file until build_audio.py runs again.
+    """
+
+    def __init__(self, directory: str = AUDIO_DIR):
+        self.directory = directory
+        self.engine: Optional[str] = None
+        self.extension = "wav"
+        # Keys known to be on disk; misses aren't remembered, a rebuild may add them
+        self._present: Set[str] = set()
+        self.refresh()
+
+    def refresh(self):
+        """
+        Re-read the index (after build_audio.py ran on a live server)
+        """
+        self._present = set()
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            self.engine = None
+            return
+        except (OSError, ValueError) as e:
+            print(f"Warning: ignoring audio cache index - {e}")
+            self.engine = None
+            return
+        self.engine = index.get("engine")
+        self.extension = index.get("extension", "wav")
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES.get(self.extension, "application/octet-stream")
+
+    def key_for(self, text: Optional[str]) -> Optional[str]:
+        """
+        Key of the rendered audio for this script, or None if it hasn't been rendered
+        """
+        if not text or self.engine is None:
+            return None
+        key = audio_key(self.engine, text)
+        if key in self._present:
+            return key
+        if os.path.isfile(audio_path(self.directory, key, self.extension)):
+            self._present.add(key)
+            return key
+        return None
+
+    def file_for(self, key: str) -> Optional[str]:
+        """
+        Path of the cached file with this key, or None
+        """
+        if not _KEY.fullmatch(key):
+            return None
+        path = audio_path(self.directory, key, self.extension)
+        return path if os.path.isfile(path) else None
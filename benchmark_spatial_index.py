@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Spatial Index Benchmark
+Compares GeoGridIndex against the linear haversine scan on synthetic
+all-India catalogues of 100, 10k and 100k monuments
+"""
+
+import argparse
+import random
+import time
+
+from geo_index import GeoGridIndex, haversine_distance
+
+# Rough bounding box of mainland India
+INDIA_BOUNDS = {"min_lat": 8.0, "max_lat": 35.0, "min_lon": 68.0, "max_lon": 97.0}
+
+SIZES = [100, 10_000, 100_000]
+RADII_KM = [0.5, 1.0, 2.0]
+
+
+def make_monuments(count, rng):
+    """Synthetic monuments, clustered around a few hundred 'city' centres"""
+    centres = [
+        (rng.uniform(INDIA_BOUNDS["min_lat"], INDIA_BOUNDS["max_lat"]),
+         rng.uniform(INDIA_BOUNDS["min_lon"], INDIA_BOUNDS["max_lon"]))
+        for _ in range(max(1, min(300, count // 20)))
+    ]
+    monuments = []
+    for i in range(count):
+        lat, lon = rng.choice(centres)
+        monuments.append({
+            "id": f"poi-{i}",
+            "name": f"POI {i}",
+            "latitude": round(lat + rng.gauss(0, 0.05), 4),
+            "longitude": round(lon + rng.gauss(0, 0.05), 4),
+        })
+    return monuments
+
+
+def linear_scan(monuments, lat, lon, radius_km):
+    """The original get_nearby_monuments loop"""
+    nearby = []
+    for monument in monuments:
+        distance = haversine_distance(lat, lon, monument['latitude'], monument['longitude'])
+        if distance <= radius_km:
+            nearby.append((distance, monument))
+    nearby.sort(key=lambda pair: pair[0])
+    return nearby
+
+
+def linear_nearest(monuments, lat, lon, k):
+    ranked = [
+        (haversine_distance(lat, lon, m['latitude'], m['longitude']), m)
+        for m in monuments
+    ]
+    ranked.sort(key=lambda pair: pair[0])
+    return ranked[:k]
+
+
+def make_queries(monuments, count, rng):
+    """Query points jittered around real monuments, like a tourist walking up to one"""
+    return [
+        (m['latitude'] + rng.gauss(0, 0.003), m['longitude'] + rng.gauss(0, 0.003))
+        for m in (rng.choice(monuments) for _ in range(count))
+    ]
+
+
+def time_per_call(fn, queries):
+    start = time.perf_counter()
+    for lat, lon in queries:
+        fn(lat, lon)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def run(sizes, queries_per_size, seed):
+    rng = random.Random(seed)
+    print(f"{'monuments':>10} {'query':>12} {'linear (ms)':>12} {'index (ms)':>12} {'speedup':>9}")
+    print("-" * 60)
+
+    for size in sizes:
+        monuments = make_monuments(size, rng)
+
+        build_start = time.perf_counter()
+        index = GeoGridIndex(monuments)
+        build_ms = (time.perf_counter() - build_start) * 1000
+
+        # The linear scan is slow at 100k, so time it on fewer queries
+        queries = make_queries(monuments, queries_per_size, rng)
+        linear_queries = queries[:max(10, queries_per_size * 1000 // max(size, 1000))]
+
+        for radius in RADII_KM:
+            for lat, lon in linear_queries:
+                assert index.within(lat, lon, radius) == linear_scan(monuments, lat, lon, radius)
+
+            linear = time_per_call(lambda la, lo: linear_scan(monuments, la, lo, radius), linear_queries)
+            indexed = time_per_call(lambda la, lo: index.within(la, lo, radius), queries)
+            print(f"{size:>10} {f'r={radius} km':>12} {linear * 1000:>12.3f} "
+                  f"{indexed * 1000:>12.4f} {linear / indexed:>8.0f}x")
+
+        for lat, lon in linear_queries:
+            assert index.nearest(lat, lon, 5) == linear_nearest(monuments, lat, lon, 5)
+
+        linear = time_per_call(lambda la, lo: linear_nearest(monuments, la, lo, 5), linear_queries)
+        indexed = time_per_call(lambda la, lo: index.nearest(la, lo, 5), queries)
+        print(f"{size:>10} {'k=5':>12} {linear * 1000:>12.3f} "
+              f"{indexed * 1000:>12.4f} {linear / indexed:>8.0f}x")
+        print(f"{'':>10} index built in {build_ms:.1f} ms, {len(index.cells)} cells")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    run(args.sizes, args.queries, args.seed)
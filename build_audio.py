@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Audio Guide Builder
+Renders every monument's audio_script to an audio file with a local
+text-to-speech engine and stores it in the content-addressed audio cache
+served by GET /api/monument/{monument_id}/audio.
+
+The engine is any command that reads a text file and writes an audio file:
+{text_file}, {output} and {voice} in it are filled in per script. Scripts
+already rendered with the same command and voice are skipped, so re-running
+after a data edit only renders what changed.
+"""
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from audio_cache import AUDIO_DIR, INDEX_FILE, MEDIA_TYPES, audio_key, audio_path
+from data_store import DATA_DIR, DataStore, _read_json
+
+# espeak-ng ships with most Linux distributions; piper or any other engine
+# with a command line works too, e.g.
+#   piper --model en_US-lessac-medium.onnx --output_file {output} < {text_file}
+# (commands with shell syntax like "<" are run through the shell)
+TTS_COMMAND = os.getenv("DISHA_TTS_COMMAND", "espeak-ng -v {voice} -f {text_file} -w {output}")
+TTS_VOICE = os.getenv("DISHA_TTS_VOICE", "en")
+
+
+def render(command: str, voice: str, text: str, output: str):
+    """
+    Run the TTS command for text and move its output atomically to output
+    """
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(output)) as work_dir:
+        text_file = os.path.join(work_dir, "script.txt")
+        with open(text_file, 'w', encoding='utf-8') as f:
+            f.write(text)
+        rendered = os.path.join(work_dir, "audio" + os.path.splitext(output)[1])
+
+        values = {"text_file": shlex.quote(text_file), "output": shlex.quote(rendered), "voice": shlex.quote(voice)}
+        filled = command.format(**values)
+        if any(char in command for char in "<>|;&"):
+            subprocess.run(filled, shell=True, check=True, capture_output=True)
+        else:
+            subprocess.run(shlex.split(filled), check=True, capture_output=True)
+
+        if not os.path.isfile(rendered) or os.path.getsize(rendered) == 0:
+            raise RuntimeError("TTS command produced no audio")
+        os.replace(rendered, output)
+
+
+def build_audio(data_dir, output_dir, command, voice, extension, jobs=4, prune=False):
+    monuments = _read_json(DataStore(data_dir, pack_path="").source_paths()[0])
+    # The command (with the voice filled in) is part of every key: another
+    # engine or voice renders into new files instead of mixing with these
+    engine = command.replace("{voice}", voice)
+
+    scripts = {}
+    for monument in monuments:
+        text = monument.get('audio_script')
+        if text:
+            scripts.setdefault(audio_key(engine, text), text)
+
+    pending = {key: text for key, text in scripts.items()
+               if not os.path.isfile(audio_path(output_dir, key, extension))}
+    os.makedirs(output_dir, exist_ok=True)
+    failures = 0
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {key: pool.submit(render, command, voice, text, audio_path(output_dir, key, extension))
+                   for key, text in pending.items()}
+        for key, future in futures.items():
+            try:
+                future.result()
+            except (OSError, RuntimeError, subprocess.CalledProcessError) as e:
+                failures += 1
+                print(f"Failed to render {key}: {e}")
+
+    removed = 0
+    if prune:
+        for folder in os.listdir(output_dir):
+            folder_path = os.path.join(output_dir, folder)
+            if not os.path.isdir(folder_path):
+                continue
+            for name in os.listdir(folder_path):
+                if os.path.splitext(name)[0] not in scripts:
+                    os.remove(os.path.join(folder_path, name))
+                    removed += 1
+
+    # Written last, so a server only looks for files with these settings once they exist
+    index_path = os.path.join(output_dir, INDEX_FILE)
+    with open(f"{index_path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump({"engine": engine, "extension": extension}, f)
+    os.replace(f"{index_path}.tmp", index_path)
+    return len(scripts), len(pending) - failures, failures, removed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=DATA_DIR, help="directory holding the JSON data files")
+    parser.add_argument("--output-dir", default=AUDIO_DIR, help="audio cache directory (default: DISHA_AUDIO_DIR)")
+    parser.add_argument("--command", default=TTS_COMMAND, help="TTS command (default: DISHA_TTS_COMMAND or espeak-ng)")
+    parser.add_argument("--voice", default=TTS_VOICE, help="voice passed to the command as {voice}")
+    parser.add_argument("--format", default="wav", choices=sorted(MEDIA_TYPES), help="file type the command writes")
+    parser.add_argument("--jobs", type=int, default=4, help="scripts rendered in parallel")
+    parser.add_argument("--prune", action="store_true", help="delete cached files no current script uses")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    total, rendered, failed, removed = build_audio(
+        args.data_dir, args.output_dir, args.command, args.voice, args.format, args.jobs, args.prune
+    )
+    print(f"{total} audio scripts: {rendered} rendered, {total - rendered - failed} already cached, "
+          f"{failed} failed, {removed} pruned in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Data Pack Builder
+Compiles monuments_data.json, safety_data.json and regions_data.json (if
+present), plus the indexes (spatial, graph and text retrieval) and
+pre-rendered strings the API derives from them, into one binary pack that
+every worker memory-maps at startup instead of parsing the JSON.
+Re-run it whenever the JSON files change; a stale pack is ignored.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from catalogue import encode_json
+from data_pack import PACK_FILE, DataPack, blob_section, cell_key, source_hash, source_stamps, write_pack
+from data_store import DATA_DIR, MONUMENTS_FILE, DataSnapshot, DataStore, _read_json, validate_data
+from geo_index import GeoGridIndex
+from regions import parse_regions
+
+
+def build_pack(data_dir, output):
+    sources = DataStore(data_dir, pack_path="").source_paths()
+    monuments_path, safety_path = sources[:2]
+    monuments = _read_json(monuments_path)
+    safety_data = _read_json(safety_path)
+    validate_data(monuments, safety_data)
+    regions_data = _read_json(sources[2]) if len(sources) > 2 else None
+
+    # Build everything exactly as DataSnapshot would from the JSON
+    snapshot = DataSnapshot(monuments, safety_data, 1, parse_regions(regions_data))
+    store = snapshot.monument_store
+    catalogue = snapshot.catalogue
+    # Whole-catalogue grid, used as is while every monument is in one shard
+    index = GeoGridIndex(monuments)
+    # Rule answers and warnings as rendered by each monument's own shard
+    rule_answers, monument_warnings = {}, {}
+    for shard in snapshot.shards:
+        rule_answers.update(shard.rule_chat.answers)
+        monument_warnings.update(shard.safety.monument_warnings)
+
+    cell_keys = sorted(index.cells)
+    cell_offsets = np.zeros(len(cell_keys) + 1, dtype=np.uint64)
+    np.cumsum([len(index.cells[key]) for key in cell_keys], out=cell_offsets[1:])
+
+    sections = {
+        "latitudes": np.array([m['latitude'] for m in monuments], dtype=np.float64).tobytes(),
+        "longitudes": np.array([m['longitude'] for m in monuments], dtype=np.float64).tobytes(),
+        "cell_keys": np.array([cell_key(row, col) for row, col in cell_keys], dtype=np.int64).tobytes(),
+        "cell_offsets": cell_offsets.tobytes(),
+        "cell_members": np.array([idx for key in cell_keys for idx in index.cells[key]], dtype=np.uint32).tobytes(),
+        "graph_indptr": snapshot.graph.indptr.astype(np.uint64).tobytes(),
+        "graph_neighbours": snapshot.graph.neighbours.astype(np.uint32).tobytes(),
+        "graph_distances": snapshot.graph.distances.astype(np.float64).tobytes(),
+        "all_body": catalogue.all_body.body,
+        "all_body_gzip": catalogue.all_body.variant("gzip"),
+        "safety": encode_json(safety_data),
+    }
+
+    records = {
+        "monuments": store.item_bytes,
+        "summaries": store.summary_bytes,
+        "rule_answers": [encode_json(rule_answers[m['id']]) for m in monuments],
+        "monument_warnings": [encode_json(list(monument_warnings[m['id']])) for m in monuments],
+    }
+    for shard in snapshot.shards:
+        # Passage index per shard, vocabulary as UTF-8 records (sorted, so lookups bisect)
+        prefix = f"retrieval_{shard.region.id}_"
+        records[f"{prefix}terms"] = [term.encode("utf-8") for term in shard.retrieval.terms]
+        for name, array in shard.retrieval.sections().items():
+            sections[f"{prefix}{name}"] = array.tobytes()
+    for name, items in records.items():
+        sections[f"{name}_offsets"], sections[name] = blob_section(items)
+
+    write_pack(output, sections, {
+        "source_hash": source_hash(*sources),
+        "source_stamps": source_stamps(*sources),
+        "regions": regions_data,
+        "cell_deg": index.cell_deg,
+        "ids": [m['id'] for m in monuments],
+        "field_names": sorted(store.field_names),
+        "all_body_etag": catalogue.all_body.etag,
+    })
+    return len(monuments)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=DATA_DIR, help="directory holding the JSON data files")
+    parser.add_argument("--output", help=f"pack file to write (default: <data-dir>/{PACK_FILE})")
+    args = parser.parse_args()
+    output = args.output or os.path.join(args.data_dir, PACK_FILE)
+
+    start = time.perf_counter()
+    count = build_pack(args.data_dir, output)
+    print(f"Wrote {output}: {count} monuments, {os.path.getsize(output):,} bytes in {time.perf_counter() - start:.2f}s")
+
+    # Sanity check: the pack opens and round-trips the first monument
+    pack = DataPack(output)
+    if count:
+        assert pack.monuments[0] == _read_json(os.path.join(args.data_dir, MONUMENTS_FILE))[0]
+    print("Pack verified")
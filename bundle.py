@@ -0,0 +1,266 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from catalogue import EncodedBody, encode_json
+from data_pack import PackedCells
+from data_store import DataSnapshot
+from geofence import area_bounds
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def _splice(head: dict, key: str, encoded_items: Sequence[bytes]) -> bytes:
+    """
+    JSON object head with key set to a list of already-encoded items
+    """
+    return encode_json(dict(head, **{key: []}))[:-3] + b"[" + b",".join(encoded_items) + b"]}"
+
+
+def zone_keys(areas: Sequence[dict]) -> List[str]:
+    """
+    Stable key of each safety zone: its area_name, numbered from the
+    second zone sharing a name ("Old Delhi #2")
+    """
+    keys = []
+    seen: Dict[str, int] = {}
+    for area in areas:
+        name = area.get('area_name', "")
+        seen[name] = seen.get(name, 0) + 1
+        keys.append(name if seen[name] == 1 else f"{name} #{seen[name]}")
+    return keys
+
+
+class RecordHashes:
+    """
+    64-bit content hashes of every record in one snapshot, sorted by the
+    hash of the record's key so two versions diff with a binary search
+    instead of dicts holding every id. Kept per version in the sync history,
+    so it stays small: 16 bytes per record.
+    """
+
+    def __init__(self, keys: Sequence[str], contents: Sequence[bytes]):
+        key_hashes = np.fromiter((_hash64(key.encode("utf-8")) for key in keys), dtype=np.uint64, count=len(keys))
+        content_hashes = np.fromiter((_hash64(content) for content in contents), dtype=np.uint64, count=len(keys))
+        self.order = np.argsort(key_hashes, kind="stable")
+        self.keys = key_hashes[self.order]
+        self.contents = content_hashes[self.order]
+
+    def changed_since(self, old: "RecordHashes") -> np.ndarray:
+        """
+        Positions (in snapshot order) of the records added or changed since old
+        """
+        pos = np.minimum(np.searchsorted(old.keys, self.keys), max(len(old.keys) - 1, 0))
+        if len(old.keys):
+            same = (old.keys[pos] == self.keys) & (old.contents[pos] == self.contents)
+        else:
+            same = np.zeros(len(self.keys), dtype=bool)
+        return np.sort(self.order[~same])
+
+    def removed_since(self, old: "RecordHashes") -> np.ndarray:
+        """
+        Key hashes of the records in old that are gone now
+        """
+        return old.keys[~np.isin(old.keys, self.keys)]
+
+    def digest(self) -> bytes:
+        return self.keys.tobytes() + self.contents.tobytes()
+
+
+class SyncVersion:
+    """
+    Record hashes of one snapshot (monuments, safety zones and the other
+    safety blocks) and the version string derived from them
+    """
+
+    def __init__(self, snapshot: DataSnapshot):
+        self.snapshot = snapshot
+        store = snapshot.monument_store
+        # Hashed from the pre-encoded bytes, so pack-backed monuments aren't decoded
+        self.monument_ids = list(store.position)
+        self.monument_positions = list(store.position.values())
+        self.monuments = RecordHashes(self.monument_ids, [store.item_bytes[idx] for idx in self.monument_positions])
+
+        self.areas: List[dict] = list(snapshot.safety_data.get('area_specific', []))
+        self.zone_keys = zone_keys(self.areas)
+        self.zones = RecordHashes(self.zone_keys, [encode_json(area) for area in self.areas])
+
+        self.safety = {key: value for key, value in snapshot.safety_data.items() if key != 'area_specific'}
+        self.safety_hash = _hash64(encode_json(self.safety))
+
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(self.monuments.digest())
+        digest.update(b"\0")
+        digest.update(self.zones.digest())
+        digest.update(self.safety_hash.to_bytes(8, "little"))
+        self.version = digest.hexdigest()
+
+    def retire(self):
+        """
+        Drop everything but the hashes once a newer version is served
+        """
+        self.snapshot = self.areas = self.safety = None
+        self.monument_ids = self.monument_positions = self.zone_keys = None
+        self.monuments.order = self.zones.order = None
+
+    def zone_boxes(self, positions: Sequence[int]) -> Dict[str, Optional[Tuple[float, float, float, float]]]:
+        return {self.zone_keys[pos]: area_bounds(self.areas[pos]) for pos in positions}
+
+
+class BundleExporter:
+    """
+    Builds the offline bundle (every monument and safety zone plus a grid
+    index over them) and deltas between bundle versions.
+
+    A version is a hash of every record's content, so workers serving the
+    same data agree on it without coordination. Each worker remembers the
+    record hashes of the last history_size versions it has served; a delta
+    from a version it doesn't know (older, or seen only by another worker
+    or before a restart) is answered with the full bundle instead.
+    """
+
+    def __init__(self, history_size: int = 16):
+        self.history_size = history_size
+        self._history: "OrderedDict[str, SyncVersion]" = OrderedDict()
+        self._current: Optional[SyncVersion] = None
+        self._bundle: Optional[EncodedBody] = None
+        self._deltas: "OrderedDict[str, EncodedBody]" = OrderedDict()
+        # Keys of records a newer version removed, by key hash, for naming
+        # them in deltas from versions that still had them
+        self._removed_monuments: Dict[int, str] = {}
+        self._removed_zones: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def _sync_version(self, snapshot: DataSnapshot) -> SyncVersion:
+        """
+        The current version, computed once per snapshot (call with the lock held)
+        """
+        if self._current is not None and self._current.snapshot is snapshot:
+            return self._current
+
+        current = SyncVersion(snapshot)
+        previous = self._current
+        self._current = current
+        if previous is not None and previous.version == current.version:
+            return current
+
+        self._bundle = None
+        self._deltas.clear()
+        if previous is not None:
+            self._remember_removed(previous, current)
+            previous.retire()
+            self._history[previous.version] = previous
+            self._history.pop(current.version, None)
+            while len(self._history) > self.history_size:
+                self._history.popitem(last=False)
+            self._forget_removed()
+        return current
+
+    def _remember_removed(self, previous: SyncVersion, current: SyncVersion):
+        for old, new, names, removed in (
+            (previous.monuments, current.monuments, previous.monument_ids, self._removed_monuments),
+            (previous.zones, current.zones, previous.zone_keys, self._removed_zones)
+        ):
+            gone = set(new.removed_since(old).tolist())
+            if gone:
+                for key in names:
+                    key_hash = _hash64(key.encode("utf-8"))
+                    if key_hash in gone:
+                        removed[key_hash] = key
+
+    def _forget_removed(self):
+        """
+        Drop the names of removed records no remembered version holds any more
+        """
+        for removed, attr in ((self._removed_monuments, "monuments"), (self._removed_zones, "zones")):
+            if not removed:
+                continue
+            key_hashes = np.fromiter(removed, dtype=np.uint64, count=len(removed))
+            held = np.zeros(len(key_hashes), dtype=bool)
+            for version in self._history.values():
+                held |= np.isin(key_hashes, getattr(version, attr).keys)
+            for key_hash in key_hashes[~held].tolist():
+                del removed[key_hash]
+
+    def _index(self, current: SyncVersion) -> dict:
+        snapshot = current.snapshot
+        cell_deg = snapshot.shards[0].monument_index.cell_deg
+        cells = PackedCells.from_coordinates(snapshot.graph.latitudes, snapshot.graph.longitudes, cell_deg)
+        ids = current.monument_ids
+        by_position = [None] * len(ids)
+        for monument_id, position in zip(ids, current.monument_positions):
+            by_position[position] = monument_id
+        return {
+            "cell_deg": cell_deg,
+            # [row, col, [monument ids]]; a point's cell is floor(lat / cell_deg), floor(lon / cell_deg)
+            "monument_cells": [[row, col, [by_position[idx] for idx in members]] for (row, col), members in cells.items()],
+            # (min_lat, max_lat, min_lon, max_lon) per zone; null: always test it
+            "zone_boxes": current.zone_boxes(range(len(current.areas)))
+        }
+
+    def bundle(self, snapshot: DataSnapshot) -> EncodedBody:
+        """
+        Full bundle of the snapshot's data, encoded and compressed once per version
+        """
+        with self._lock:
+            current = self._sync_version(snapshot)
+            if self._bundle is None:
+                store = snapshot.monument_store
+                body = _splice({
+                    "success": True,
+                    "full": True,
+                    "version": current.version,
+                    "safety": current.safety,
+                    "zones": dict(zip(current.zone_keys, current.areas)),
+                    "index": self._index(current)
+                }, "monuments", [store.item_bytes[idx] for idx in range(len(current.monument_ids))])
+                self._bundle = EncodedBody(body, etag=f'"{current.version}"')
+                self._bundle.warm()
+            return self._bundle
+
+    def delta(self, snapshot: DataSnapshot, since: str) -> EncodedBody:
+        """
+        Records added, changed or removed since version since; the full
+        bundle if since is unknown
+        """
+        with self._lock:
+            current = self._sync_version(snapshot)
+            old = current if since == current.version else self._history.get(since)
+            if old is None:
+                known = False
+            else:
+                known = True
+                encoded = self._deltas.get(since)
+                if encoded is None:
+                    encoded = self._deltas[since] = self._encode_delta(current, old)
+                    while len(self._deltas) > self.history_size:
+                        self._deltas.popitem(last=False)
+                else:
+                    self._deltas.move_to_end(since)
+        return encoded if known else self.bundle(snapshot)
+
+    def _encode_delta(self, current: SyncVersion, old: SyncVersion) -> EncodedBody:
+        changed_zones = current.zones.changed_since(old.zones).tolist()
+        head = {
+            "success": True,
+            "full": False,
+            "since": old.version,
+            "version": current.version,
+            "removed_monuments": [self._removed_monuments[key]
+                                  for key in current.monuments.removed_since(old.monuments).tolist()],
+            "zones": {current.zone_keys[pos]: current.areas[pos] for pos in changed_zones},
+            "removed_zones": [self._removed_zones[key] for key in current.zones.removed_since(old.zones).tolist()],
+            "zone_boxes": current.zone_boxes(changed_zones)
+        }
+        if old.safety_hash != current.safety_hash:
+            head["safety"] = current.safety
+
+        item_bytes = current.snapshot.monument_store.item_bytes
+        changed = [item_bytes[current.monument_positions[pos]]
+                   for pos in current.monuments.changed_since(old.monuments).tolist()]
+        return EncodedBody(_splice(head, "monuments", changed), etag=f'"{old.version}-{current.version}"')
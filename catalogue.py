@@ -0,0 +1,197 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Union
+
+from data_pack import PackedMapping
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are served without it
+    brotli = None
+
+
+def encode_json(content) -> bytes:
+    """
+    Encode exactly like FastAPI's default JSONResponse
+    """
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class EncodedBody:
+    """
+    A pre-encoded JSON response body with its ETag and compressed variants.
+    Compressed variants are produced on first use and then reused.
+    """
+
+    def __init__(self, body: Union[bytes, memoryview], etag: Optional[str] = None,
+                 variants: Optional[Dict[str, Union[bytes, memoryview]]] = None):
+        self.body = body
+        self.etag = etag or f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self._variants: Dict[str, bytes] = dict(variants or {})
+
+    def variant(self, encoding: str) -> bytes:
+        """
+        Body for a Content-Encoding of 'identity', 'gzip' or 'br'
+        """
+        if encoding == "identity":
+            return self.body
+
+        compressed = self._variants.get(encoding)
+        if compressed is None:
+            if encoding == "br":
+                compressed = brotli.compress(self.body)
+            else:
+                compressed = gzip.compress(self.body, compresslevel=9, mtime=0)
+            self._variants[encoding] = compressed
+        return compressed
+
+    def warm(self):
+        """
+        Compress every supported variant up front
+        """
+        self.variant("gzip")
+        if brotli is not None:
+            self.variant("br")
+
+
+class CatalogueResponses:
+    """
+    Id-to-monument index plus pre-encoded response bodies for the catalogue
+    endpoints, built once when the data is loaded.
+    """
+
+    # Bounded cache of encoded pages / field projections of /api/monuments/all
+    MAX_CACHED_PAGES = 256
+
+    def __init__(self, monuments: Sequence[dict], item_bytes: Optional[Sequence[bytes]] = None,
+                 position: Optional[Dict[str, int]] = None, field_names: Optional[set] = None,
+                 all_body: Optional["EncodedBody"] = None):
+        self.monuments: Sequence[dict] = monuments
+        self._pages = OrderedDict()
+        self._pages_lock = threading.Lock()
+
+        if position is not None:
+            # Prebuilt (from a data pack or a MonumentStore): per-monument
+            # lookups and bodies are built on first request instead of for
+            # the whole catalogue
+            self.by_id = PackedMapping(position, monuments.__getitem__)
+            self.field_names = set(field_names)
+            self._item_bytes = item_bytes
+            self.monument_bodies = PackedMapping(
+                position, lambda idx: EncodedBody(b'{"success":true,"monument":' + item_bytes[idx] + b"}")
+            )
+            if all_body is None:
+                all_body = EncodedBody(self._envelope(item_bytes))
+                all_body.warm()
+            self.all_body = all_body
+            return
+
+        self.by_id: Dict[str, dict] = {monument['id']: monument for monument in self.monuments}
+        self.field_names = set()
+        for monument in self.monuments:
+            self.field_names.update(monument)
+
+        self.monument_bodies: Dict[str, EncodedBody] = {
+            monument['id']: EncodedBody(encode_json({"success": True, "monument": monument}))
+            for monument in self.monuments
+        }
+        # Each monument encoded once (shared with MonumentStore when given)
+        self._item_bytes = item_bytes if item_bytes is not None else [encode_json(monument) for monument in self.monuments]
+        self.all_body = EncodedBody(self._envelope(self._item_bytes))
+
+        self.all_body.warm()
+        for body in self.monument_bodies.values():
+            body.warm()
+
+    def _envelope(self, item_bytes: Sequence[bytes], extra: Optional[dict] = None) -> bytes:
+        """
+        The /api/monuments/all body around already-encoded monuments
+        """
+        head = {"success": True, "total_monuments": len(self.monuments)}
+        if extra:
+            head.update(extra)
+        # Splice the encoded monument list in place of an empty one
+        return encode_json(dict(head, monuments=[]))[:-3] + b"[" + b",".join(item_bytes) + b"]}"
+
+    def unknown_fields(self, fields: Sequence[str]) -> List[str]:
+        return [field for field in fields if field not in self.field_names]
+
+    def page(self, offset: int = 0, limit: Optional[int] = None,
+             fields: Optional[Sequence[str]] = None) -> EncodedBody:
+        """
+        Encoded /api/monuments/all body for a slice of the catalogue,
+        optionally projected to the given fields ('id' is always included)
+        """
+        if offset == 0 and limit is None and not fields:
+            return self.all_body
+
+        fields = tuple(dict.fromkeys(["id", *fields])) if fields else None
+        key = (offset, limit, fields)
+        with self._pages_lock:
+            cached = self._pages.get(key)
+            if cached is not None:
+                self._pages.move_to_end(key)
+                return cached
+
+        end = None if limit is None else offset + limit
+        if fields is None:
+            item_bytes = self._item_bytes[offset:end]
+        else:
+            item_bytes = [
+                encode_json({field: monument[field] for field in fields if field in monument})
+                for monument in self.monuments[offset:end]
+            ]
+
+        extra = {"offset": offset, "limit": limit}
+        if fields is not None:
+            extra["fields"] = list(fields)
+        encoded = EncodedBody(self._envelope(item_bytes, extra))
+
+        with self._pages_lock:
+            self._pages[key] = encoded
+            while len(self._pages) > self.MAX_CACHED_PAGES:
+                self._pages.popitem(last=False)
+        return encoded
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """
+    Pick 'br', 'gzip' or 'identity' from an Accept-Encoding header
+    """
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip())
+
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Weak comparison of an If-None-Match header against an ETag
+    """
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
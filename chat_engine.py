@@ -1,179 +1,665 @@
+import asyncio
+import logging
 import os
+import re
+import time
+from functools import lru_cache
+from typing import AsyncIterator, Callable, Mapping, Optional, Sequence, Tuple
 import groq
+import httpx
 from dotenv import load_dotenv
+from circuit_breaker import CircuitBreaker, CircuitOpenError, parse_retry_after
+from metrics import CHAT_ANSWERS, LLM_TOKENS, STAGE_SECONDS, stage_timer
+from prompt_builder import SYSTEM_PROMPT_TEMPLATE, PromptBuilder
+from regions import DEFAULT_RULE_TEXTS, Region
+from retrieval import Passage
+from response_cache import ResponseCache
+from single_flight import BrokenFlight, Flight, SingleFlight
 
 # Load environment variables
 load_dotenv()
 
-class GroqChat:
+GROQ_MODEL = "llama-3.3-70b-versatile"
+
+# Async client settings (shared client, pooled connections, bounded concurrency)
+GROQ_TIMEOUT_SECONDS = float(os.getenv("GROQ_TIMEOUT_SECONDS", "10"))
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "32"))
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "16"))
+# How long a request may wait for a free concurrency slot before falling back
+GROQ_QUEUE_TIMEOUT_SECONDS = float(os.getenv("GROQ_QUEUE_TIMEOUT_SECONDS", "2"))
+
+# Circuit breaker: after GROQ_BREAKER_FAILURES failed calls within the window
+# (or one 429), skip Groq for GROQ_BREAKER_OPEN_SECONDS (or the Retry-After)
+GROQ_BREAKER = CircuitBreaker(
+    failure_threshold=int(os.getenv("GROQ_BREAKER_FAILURES", "5")),
+    window_seconds=float(os.getenv("GROQ_BREAKER_WINDOW_SECONDS", "30")),
+    open_seconds=float(os.getenv("GROQ_BREAKER_OPEN_SECONDS", "30")),
+    max_open_seconds=float(os.getenv("GROQ_BREAKER_MAX_OPEN_SECONDS", "300"))
+)
+
+# Cache of LLM answers, shared by the plain and streaming paths
+RESPONSE_CACHE = ResponseCache(
+    max_entries=int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "1024")),
+    ttl_seconds=float(os.getenv("CHAT_CACHE_TTL_SECONDS", str(6 * 3600))),
+    persist_path=os.getenv("CHAT_CACHE_PATH") or None
+)
+
+# Number of nearby monuments that go into the system prompt
+PROMPT_MONUMENTS = 2
+
+# Input-token budget for system prompt + question; monument context is trimmed to fit
+GROQ_INPUT_TOKEN_BUDGET = int(os.getenv("GROQ_INPUT_TOKEN_BUDGET", "300"))
+# Tokens of retrieved passages added on top of that budget
+GROQ_RETRIEVAL_TOKEN_BUDGET = int(os.getenv("GROQ_RETRIEVAL_TOKEN_BUDGET", "120"))
+# Cap on answer length (the prompt asks for under 80 words)
+GROQ_MAX_TOKENS = int(os.getenv("GROQ_MAX_TOKENS", "200"))
+
+PROMPT_BUILDER = PromptBuilder(input_token_budget=GROQ_INPUT_TOKEN_BUDGET,
+                               retrieval_token_budget=GROQ_RETRIEVAL_TOKEN_BUDGET)
+
+logger = logging.getLogger(__name__)
+
+def build_messages(user_message: str, nearby_monuments: list,
+                   template: str = SYSTEM_PROMPT_TEMPLATE,
+                   passages: Sequence[Passage] = ()) -> Tuple[list, int]:
+    """
+    Build the system + user messages sent to Groq, with the estimated input tokens
+    """
+    return PROMPT_BUILDER.build(user_message, nearby_monuments[:PROMPT_MONUMENTS], template, passages)
+
+def prompt_template_for(region: Optional[Region]) -> str:
+    return region.prompt_template if region is not None else SYSTEM_PROMPT_TEMPLATE
+
+def cache_key_for(user_message: str, nearby_monuments: list, region: Optional[Region]) -> str:
+    """
+    Answer cache (and in-flight) key; regions prompt differently, so they don't share answers
+    """
+    region_id = region.id if region is not None else ""
+    return RESPONSE_CACHE.make_key(user_message, nearby_monuments[:PROMPT_MONUMENTS], region_id)
+
+def record_usage(usage, estimated_prompt_tokens: int):
+    """
+    Count the tokens Groq reports for a call (usage may be None, e.g. a cut-off stream)
+    """
+    LLM_TOKENS.inc("estimated_prompt", amount=estimated_prompt_tokens)
+    if usage is None:
+        return
+    LLM_TOKENS.inc("prompt", amount=usage.prompt_tokens)
+    LLM_TOKENS.inc("completion", amount=usage.completion_tokens)
+    logger.info("Groq usage: %d prompt tokens (estimated %d), %d completion tokens",
+                usage.prompt_tokens, estimated_prompt_tokens, usage.completion_tokens)
+
+def record_groq_error(error: Exception):
+    """
+    Tell the circuit breaker what a failed Groq call says about Groq's health
+    """
+    if isinstance(error, groq.RateLimitError):
+        retry_after = parse_retry_after(error.response.headers)
+        GROQ_BREAKER.record_failure(retry_after if retry_after is not None else GROQ_BREAKER.open_seconds)
+    elif isinstance(error, (groq.APIConnectionError, groq.InternalServerError,
+                            groq.AuthenticationError, groq.PermissionDeniedError)):
+        # Timeouts, network errors, 5xx and a rejected key will hit the next call too
+        GROQ_BREAKER.record_failure()
+    else:
+        # Specific to this request (e.g. 400), or not from Groq at all
+        GROQ_BREAKER.record_neutral()
+
+class AsyncGroqChat:
+    """
+    Long-lived async Groq client: one pooled HTTP connection pool per worker,
+    request timeouts, and a cap on concurrent in-flight LLM calls
+    """
     def __init__(self):
         api_key = os.getenv("GROQ_API_KEY")
         if not api_key:
             raise ValueError("GROQ_API_KEY not found in environment variables")
-        self.client = groq.Groq(api_key=api_key)
+        http_client = groq.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=GROQ_MAX_CONNECTIONS
+            ),
+            timeout=GROQ_TIMEOUT_SECONDS
+        )
+        self.client = groq.AsyncGroq(
+            api_key=api_key,
+            timeout=GROQ_TIMEOUT_SECONDS,
+            # No SDK retries: it would sleep out a 429's Retry-After before
+            # GROQ_BREAKER heard of it, so the breaker does all the backing off
+            max_retries=0,
+            http_client=http_client
+        )
+        self.semaphore = asyncio.Semaphore(GROQ_MAX_CONCURRENCY)
     
-    def get_response(self, user_message: str, nearby_monuments: list) -> str:
+    async def get_response(self, user_message: str, nearby_monuments: list,
+                           template: str = SYSTEM_PROMPT_TEMPLATE,
+                           passages: Sequence[Passage] = ()) -> Optional[str]:
+        """
+        Groq's answer, or None if the call failed or found no free slot.
+        Raises CircuitOpenError if the circuit breaker refused the call.
+        """
+        # Groq is failing or rate limited: don't wait for another failure
+        if not GROQ_BREAKER.allow():
+            raise CircuitOpenError()
+        
         try:
-            # Build context about nearby monuments (max 2)
-            monument_context = ""
-            if nearby_monuments:
-                for i, monument in enumerate(nearby_monuments[:2]):
-                    monument_context += f"\n- {monument['name']} ({monument.get('distance_km', 0):.1f} km away): {monument['description']}"
-            
-            # Build system prompt
-            no_monuments_text = "\nNo monuments nearby."
-            context_text = monument_context if monument_context else no_monuments_text
+            # Don't queue behind a saturated pool for long; the rule engine answers instantly
+            with stage_timer("groq_queue_wait"):
+                await asyncio.wait_for(self.semaphore.acquire(), timeout=GROQ_QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            GROQ_BREAKER.record_neutral()
+            return None
+        except asyncio.CancelledError:
+            GROQ_BREAKER.record_neutral()
+            raise
+        
+        recorded = False
+        try:
+            with stage_timer("prompt_build"):
+                messages, estimated_tokens = build_messages(user_message, nearby_monuments, template, passages)
             
-            system_prompt = f"""You are a friendly, knowledgeable AI tour guide for Delhi, India. A tourist is standing right in front of a monument and talking to you.
-
-Context - Nearby monuments:{context_text}
-
-Constraints: Reply in under 80 words. Speak naturally as if face-to-face. Use present tense. If you don't know something, say so — do not make up facts. If the tourist asks about pricing or safety, use only the data you have been given."""
-
-            # Make API call
-            response = self.client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                max_tokens=200,
-                temperature=0.7
-            )
+            with stage_timer("groq_call"):
+                response = await self.client.chat.completions.create(
+                    model=GROQ_MODEL,
+                    messages=messages,
+                    max_tokens=GROQ_MAX_TOKENS,
+                    temperature=0.7
+                )
             
+            GROQ_BREAKER.record_success()
+            recorded = True
+            record_usage(response.usage, estimated_tokens)
             return response.choices[0].message.content
             
         except Exception as e:
-            # Return None on any error (429, network, etc.)
+            # Return None on any error (429, network, timeout, etc.)
+            record_groq_error(e)
+            recorded = True
             return None
+        finally:
+            if not recorded:
+                # Cancelled mid-call
+                GROQ_BREAKER.record_neutral()
+            self.semaphore.release()
+    
+    async def stream_response(self, user_message: str, nearby_monuments: list,
+                              template: str = SYSTEM_PROMPT_TEMPLATE,
+                              passages: Sequence[Passage] = ()) -> AsyncIterator[str]:
+        """
+        Yield completion tokens as Groq produces them. Yields nothing if the
+        call cannot start (no free slot, 429, network error, etc.), raises
+        CircuitOpenError if the circuit breaker refused it, and re-raises if
+        the stream breaks after the first token
+        """
+        if not GROQ_BREAKER.allow():
+            raise CircuitOpenError()
+        
+        try:
+            with stage_timer("groq_queue_wait"):
+                await asyncio.wait_for(self.semaphore.acquire(), timeout=GROQ_QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            GROQ_BREAKER.record_neutral()
+            return
+        except asyncio.CancelledError:
+            GROQ_BREAKER.record_neutral()
+            raise
+        
+        streamed_any = False
+        recorded = False
+        try:
+            with stage_timer("prompt_build"):
+                messages, estimated_tokens = build_messages(user_message, nearby_monuments, template, passages)
+            
+            started = time.perf_counter()
+            stream = await self.client.chat.completions.create(
+                model=GROQ_MODEL,
+                messages=messages,
+                max_tokens=GROQ_MAX_TOKENS,
+                temperature=0.7,
+                stream=True
+            )
+            
+            usage = None
+            async for chunk in stream:
+                # Groq reports usage on the final chunk
+                if chunk.x_groq is not None and chunk.x_groq.usage is not None:
+                    usage = chunk.x_groq.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if not streamed_any:
+                        STAGE_SECONDS.observe(time.perf_counter() - started, "groq_first_token")
+                    streamed_any = True
+                    yield chunk.choices[0].delta.content
+            
+            GROQ_BREAKER.record_success()
+            recorded = True
+            record_usage(usage, estimated_tokens)
+                    
+        except Exception as e:
+            record_groq_error(e)
+            recorded = True
+            # Before the first token this just means "fall back"; after it,
+            # the answer is cut short and the caller needs to know
+            if streamed_any:
+                raise
+        finally:
+            if not recorded:
+                # Cancelled, or the consumer stopped reading
+                GROQ_BREAKER.record_neutral()
+            self.semaphore.release()
+    
+    async def close(self):
+        await self.client.close()
+
+# Shared async client, created on first use (None if Groq is not configured)
+_async_groq_chat = None
+_async_groq_unavailable = False
+
+def get_async_groq_chat() -> Optional[AsyncGroqChat]:
+    """
+    Return the shared AsyncGroqChat, creating it on first call
+    """
+    global _async_groq_chat, _async_groq_unavailable
+    if _async_groq_chat is None and not _async_groq_unavailable:
+        try:
+            _async_groq_chat = AsyncGroqChat()
+        except Exception:
+            _async_groq_unavailable = True
+    return _async_groq_chat
+
+async def close_async_groq_chat():
+    """
+    Close the shared async client's connection pool (call on shutdown)
+    """
+    global _async_groq_chat
+    if _async_groq_chat is not None:
+        await _async_groq_chat.close()
+        _async_groq_chat = None
+
+# In-flight Groq answers by cache key, so concurrent identical questions share one call
+CHAT_FLIGHTS = SingleFlight()
+
+async def _fetch_groq_answer(groq_chat: AsyncGroqChat, user_message: str, nearby_monuments: list,
+                             template: str, passages: Sequence[Passage], cache_key: str, flight: Flight):
+    try:
+        groq_response = await groq_chat.get_response(user_message, nearby_monuments, template, passages)
+    except CircuitOpenError:
+        # Opened since the caller checked; Groq wasn't called, so it didn't fail
+        CHAT_ANSWERS.inc("circuit_open")
+        flight.finish(ok=False)
+        return
+    if groq_response is None:
+        CHAT_ANSWERS.inc("groq_failure")
+        flight.finish(ok=False)
+        return
+    
+    CHAT_ANSWERS.inc("groq_success")
+    # Cache before the flight ends, so the next identical question hits the cache
+    RESPONSE_CACHE.set(cache_key, groq_response)
+    flight.push(groq_response)
+    flight.finish(ok=True)
+
+async def _stream_groq_answer(groq_chat: AsyncGroqChat, user_message: str, nearby_monuments: list,
+                              template: str, passages: Sequence[Passage], cache_key: str, flight: Flight):
+    try:
+        async for token in groq_chat.stream_response(user_message, nearby_monuments, template, passages):
+            flight.push(token)
+    except CircuitOpenError:
+        CHAT_ANSWERS.inc("circuit_open")
+        flight.finish(ok=False)
+        return
+    except Exception:
+        # Stream broke mid-answer: followers keep what was sent, but it isn't cached
+        CHAT_ANSWERS.inc("groq_failure")
+        flight.finish(ok=False)
+        return
+    
+    if not flight.chunks:
+        CHAT_ANSWERS.inc("groq_failure")
+        flight.finish(ok=False)
+        return
+    
+    CHAT_ANSWERS.inc("groq_success")
+    RESPONSE_CACHE.set(cache_key, "".join(flight.chunks))
+    flight.finish(ok=True)
+
+# Rule-based intents in priority order: the first intent with any keyword in
+# the message wins. Keywords match as plain substrings of the lowercased message.
+RULE_INTENTS = [
+    ("greeting", ['hello', 'hi', 'hey', 'namaste']),
+    ("location", ['where', 'nearby', 'close', 'near me', "what's around"]),
+    ("prices", ['price', 'cost', 'ticket', 'how much', 'entry fee']),
+    ("safety", ['safe', 'scam', 'careful', 'cheat', 'danger', 'warning']),
+    ("food", ['food', 'eat', 'restaurant', 'hungry', 'lunch', 'dinner']),
+    ("history", ['tell me', 'history', 'about', 'info', 'what is', 'describe']),
+    ("directions", ['how to reach', 'directions', 'route']),
+    ("timings", ['open', 'hours', 'timing', 'when', 'closed']),
+    ("help", ['help', 'what can you do']),
+]
+
+def _trie_pattern(words) -> str:
+    """
+    Regex for a set of literal words, factored into a prefix trie so the
+    engine follows one branch per character instead of trying every word.
+    Longer words are preferred where one word is a prefix of another.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def render(node):
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+    
+    return render(trie)
+
+# Priority of each keyword: the rank of the first intent listing it
+_KEYWORD_RANK = {}
+for _rank, (_intent, _words) in enumerate(RULE_INTENTS):
+    for _word in _words:
+        _KEYWORD_RANK.setdefault(_word, _rank)
+
+# Wherever a keyword matches, every keyword that is a prefix of it matches at
+# the same position too, so rank each keyword by the best of its prefixes
+_MATCH_RANK = {
+    word: min(rank for prefix, rank in _KEYWORD_RANK.items() if word.startswith(prefix))
+    for word in _KEYWORD_RANK
+}
+
+# One pattern for all intents. The lookahead makes findall report the longest
+# keyword starting at every position (overlaps included), so the best rank
+# among them is the intent the old sequence of `any(word in message ...)`
+# checks would have picked.
+_INTENT_PATTERN = re.compile(f"(?=({_trie_pattern(_KEYWORD_RANK)}))")
+
+@lru_cache(maxsize=4096)
+def match_intent(message_lower: str) -> Optional[str]:
+    """
+    Return the highest-priority intent mentioned in the message, or None
+    """
+    keywords = _INTENT_PATTERN.findall(message_lower)
+    if not keywords:
+        return None
+    return RULE_INTENTS[min(map(_MATCH_RANK.__getitem__, keywords))][0]
+
+def render_monument_answers(monument: dict, texts: Mapping[str, str] = DEFAULT_RULE_TEXTS,
+                            neighbours: Sequence[Tuple[str, float]] = ()) -> dict:
+    """
+    Render every distance-independent rule-based answer for one monument,
+    plus the fixed parts of the answers that include a distance (texts are
+    the monument's region's rule texts, neighbours the closest other
+    monuments as (name, distance_km))
+    """
+    name = monument['name']
+    pricing = monument.get('pricing', {})
+    fair_prices = monument.get('fair_prices', {})
+    
+    price_lines = [
+        f"Entry fees for {name}:",
+        f"• Indians: ₹{pricing.get('indian', 'N/A')}",
+        f"• Foreigners: ₹{pricing.get('foreigner', 'N/A')}",
+        f"• Children under 15: {pricing.get('children_under_15', 'N/A')}",
+    ]
+    if fair_prices:
+        price_lines.append("\nAdditional services:")
+        for service, price in fair_prices.items():
+            price_lines.append(f"• {service.replace('_', ' ').title()}: {price}")
+    
+    warnings = monument.get('safety_warnings', [])
+    safety = None
+    if warnings:
+        safety = "\n".join([f"Safety tips for {name}:"] + [f"• {warning}" for warning in warnings[:3]])
+    
+    # Return first 200 chars of combined info
+    combined_info = f"{monument.get('description', '')} {monument.get('audio_script', '')}"
+    if len(combined_info) > 200:
+        combined_info = combined_info[:200] + "..."
+    
+    closest = ""
+    if neighbours:
+        closest = " Closest sights: " + ", ".join(f"{other} ({km:.1f} km)" for other, km in neighbours) + "."
+    
+    hours = monument.get('opening_hours', 'Not available')
+    best_time = monument.get('best_time_to_visit', 'Not specified')
+    
+    return {
+        "greeting": (f"Namaste! Welcome to {name}, ", " km away. Want to know about its history, ticket prices, or safety tips?"),
+        "location_line": (f"• {name} — ", f" km ({monument['category']})"),
+        "prices": "\n".join(price_lines).strip(),
+        "safety": safety,
+        "history": f"{name}: {combined_info}",
+        "directions": f"Coordinates for {name}: {monument['latitude']}, {monument['longitude']}.{closest} Use {texts['transport']} for directions.",
+        "timings": f"{name} timings:\n• Hours: {hours}\n• Best time: {best_time}",
+    }
+
+# Intents answered from retrieved passages when no monument is nearby
+PASSAGE_INTENTS = frozenset(("greeting", "location", "prices", "history", "directions", "timings"))
+# Characters of each passage quoted in a rule-based answer
+PASSAGE_SNIPPET_CHARS = 160
+
+def render_passage_answer(passages: Sequence[Passage]) -> str:
+    """
+    List the best passage of each monument among the retrieved ones
+    """
+    lines = []
+    seen = set()
+    for passage in passages:
+        if passage.monument_id in seen:
+            continue
+        seen.add(passage.monument_id)
+        snippet = passage.text
+        if len(snippet) > PASSAGE_SNIPPET_CHARS:
+            snippet = snippet[:PASSAGE_SNIPPET_CHARS].rsplit(" ", 1)[0] + "..."
+        lines.append(f"• {passage.name}: {snippet}")
+    return "Here's what I found:\n" + "\n".join(lines)
 
 class RuleBasedChat:
-    def get_response(self, user_message: str, nearby_monuments: list) -> str:
-        message_lower = user_message.lower()
+    """
+    Keyword-driven fallback guide. Intents are matched with one precompiled
+    pattern and answers for each known monument are rendered once, up front.
+    texts override DEFAULT_RULE_TEXTS for the region this engine serves, and
+    neighbours(monument_id) gives the closest other monuments for directions.
+    Questions it has no monument for are answered from retrieved passages.
+    """
+    def __init__(self, monuments: Optional[list] = None, answers: Optional[Mapping[str, dict]] = None,
+                 texts: Optional[Mapping[str, str]] = None,
+                 neighbours: Optional[Callable[[str], Sequence[Tuple[str, float]]]] = None):
+        self.texts = dict(DEFAULT_RULE_TEXTS, **(texts or {}))
+        # answers may come prebuilt (e.g. rendered into a data pack)
+        self.answers = answers if answers is not None else {
+            monument['id']: render_monument_answers(
+                monument, self.texts, neighbours(monument['id']) if neighbours else ()
+            )
+            for monument in (monuments or [])
+        }
+    
+    def _answers_for(self, monument: dict) -> dict:
+        answers = self.answers.get(monument.get('id'))
+        if answers is None:
+            # Not in the catalogue this engine was built from; render on the fly
+            answers = render_monument_answers(monument, self.texts)
+        return answers
+    
+    def get_response(self, user_message: str, nearby_monuments: list, passages: Sequence[Passage] = ()) -> str:
+        intent = match_intent(user_message.lower())
+        nearest = nearby_monuments[0] if nearby_monuments else None
+        
+        # Nothing nearby to answer about, or no intent recognised: use what retrieval found
+        if passages and (intent is None or (nearest is None and intent in PASSAGE_INTENTS)):
+            return render_passage_answer(passages)
         
         # Greeting
-        if any(word in message_lower for word in ['hello', 'hi', 'hey', 'namaste']):
-            if nearby_monuments:
-                nearest = nearby_monuments[0]
-                return f"Namaste! Welcome to {nearest['name']}, {nearest.get('distance_km', 0):.1f} km away. Want to know about its history, ticket prices, or safety tips?"
+        if intent == "greeting":
+            if nearest:
+                prefix, suffix = self._answers_for(nearest)["greeting"]
+                return f"{prefix}{nearest.get('distance_km', 0):.1f}{suffix}"
             else:
-                return "Namaste! Welcome to Delhi. Tell me where you are or what you'd like to explore!"
+                return self.texts["welcome"]
         
         # Location
-        if any(word in message_lower for word in ['where', 'nearby', 'close', 'near me', "what's around"]):
+        if intent == "location":
             if nearby_monuments:
-                monument_list = ""
+                lines = []
                 for monument in nearby_monuments[:3]:
-                    monument_list += f"• {monument['name']} — {monument.get('distance_km', 0):.1f} km ({monument['category']})\n"
-                return f"Here are nearby attractions:\n{monument_list.strip()}"
+                    prefix, suffix = self._answers_for(monument)["location_line"]
+                    lines.append(f"{prefix}{monument.get('distance_km', 0):.1f}{suffix}")
+                return "Here are nearby attractions:\n" + "\n".join(lines)
             else:
-                return "You're in Delhi! Popular areas to explore: Connaught Place (CP), Old Delhi/Chandni Chowk, and South Delhi monuments."
+                return self.texts["explore"]
         
         # Prices
-        if any(word in message_lower for word in ['price', 'cost', 'ticket', 'how much', 'entry fee']):
-            if nearby_monuments:
-                nearest = nearby_monuments[0]
-                pricing = nearest.get('pricing', {})
-                fair_prices = nearest.get('fair_prices', {})
-                
-                price_info = f"Entry fees for {nearest['name']}:\n"
-                price_info += f"• Indians: ₹{pricing.get('indian', 'N/A')}\n"
-                price_info += f"• Foreigners: ₹{pricing.get('foreigner', 'N/A')}\n"
-                price_info += f"• Children under 15: {pricing.get('children_under_15', 'N/A')}\n"
-                
-                if fair_prices:
-                    price_info += "\nAdditional services:\n"
-                    for service, price in fair_prices.items():
-                        price_info += f"• {service.replace('_', ' ').title()}: {price}\n"
-                
-                return price_info.strip()
+        if intent == "prices":
+            if nearest:
+                return self._answers_for(nearest)["prices"]
             else:
                 return "Please tell me which monument you're interested in for pricing information."
         
         # Safety
-        if any(word in message_lower for word in ['safe', 'scam', 'careful', 'cheat', 'danger', 'warning']):
-            if nearby_monuments:
-                nearest = nearby_monuments[0]
-                warnings = nearest.get('safety_warnings', [])
-                if warnings:
-                    safety_info = f"Safety tips for {nearest['name']}:\n"
-                    for warning in warnings[:3]:
-                        safety_info += f"• {warning}\n"
-                    return safety_info.strip()
+        if intent == "safety":
+            if nearest:
+                safety = self._answers_for(nearest)["safety"]
+                if safety:
+                    return safety
             return "General safety tips: Use official guides, keep valuables secure, verify ticket counters, and trust your instincts."
         
         # Food
-        if any(word in message_lower for word in ['food', 'eat', 'restaurant', 'hungry', 'lunch', 'dinner']):
-            return """Food recommendations by area:
-• Old Delhi: Karim's (₹200-500), Chandni Chowk street food (₹50-150)
-• Connaught Place: Mid-range restaurants (₹300-800)
-• South Delhi: Cafes and fine dining (₹500-1500)
-Always choose busy stalls for street food!"""
+        if intent == "food":
+            return self.texts["food"]
         
         # History
-        if any(word in message_lower for word in ['tell me', 'history', 'about', 'info', 'what is', 'describe']):
-            if nearby_monuments:
-                nearest = nearby_monuments[0]
-                description = nearest.get('description', '')
-                audio_script = nearest.get('audio_script', '')
-                
-                # Return first 200 chars of combined info
-                combined_info = f"{description} {audio_script}"
-                if len(combined_info) > 200:
-                    combined_info = combined_info[:200] + "..."
-                
-                return f"{nearest['name']}: {combined_info}"
+        if intent == "history":
+            if nearest:
+                return self._answers_for(nearest)["history"]
             else:
                 return "Please tell me which monument you'd like to know about."
         
         # Directions
-        if any(word in message_lower for word in ['how to reach', 'directions', 'route']):
-            if nearby_monuments:
-                nearest = nearby_monuments[0]
-                return f"Coordinates for {nearest['name']}: {nearest['latitude']}, {nearest['longitude']}. Use Google Maps, Uber, or Delhi Metro for directions."
+        if intent == "directions":
+            if nearest:
+                return self._answers_for(nearest)["directions"]
             else:
                 return "Please specify which location you want directions to."
         
         # Timings
-        if any(word in message_lower for word in ['open', 'hours', 'timing', 'when', 'closed']):
-            if nearby_monuments:
-                nearest = nearby_monuments[0]
-                hours = nearest.get('opening_hours', 'Not available')
-                best_time = nearest.get('best_time_to_visit', 'Not specified')
-                return f"{nearest['name']} timings:\n• Hours: {hours}\n• Best time: {best_time}"
+        if intent == "timings":
+            if nearest:
+                return self._answers_for(nearest)["timings"]
             else:
                 return "Please specify which monument you're asking about."
         
         # Help
-        if 'help' in message_lower or 'what can you do' in message_lower:
+        if intent == "help":
             return "I can help with: history, prices, safety, food recommendations, directions, and timings. What would you like to know?"
         
         # Default
         return "I can help with history, prices, safety, food, directions, and timings. What would you like to know?"
 
-def get_chat_response(user_message: str, nearby_monuments: list, lat: float, lon: float) -> dict:
+# Rule engine used when the caller doesn't pass one built from its catalogue
+_default_rule_chat = RuleBasedChat()
+
+def _rule_fallback(user_message: str, nearby_monuments: list, rule_chat: Optional[RuleBasedChat],
+                   passages: Sequence[Passage] = ()) -> str:
     """
-    Main function to get chat response - tries Groq first, falls back to rule-based
+    Answer with the rule engine, recording it as a fallback
     """
-    try:
-        # Try Groq first
-        groq_chat = GroqChat()
-        groq_response = groq_chat.get_response(user_message, nearby_monuments)
+    CHAT_ANSWERS.inc("rule_fallback")
+    with stage_timer("rule_fallback"):
+        return (rule_chat or _default_rule_chat).get_response(user_message, nearby_monuments, passages)
+
+async def get_chat_response_async(user_message: str, nearby_monuments: list, lat: float, lon: float,
+                                  rule_chat: Optional[RuleBasedChat] = None, region: Optional[Region] = None,
+                                  passages: Sequence[Passage] = ()) -> dict:
+    """
+    Chat answer: tries Groq first, falls back to rule-based. rule_chat and
+    region are those of the shard serving the tourist's location, passages
+    those its retrieval index found for the question. Uses the shared
+    AsyncGroqChat so the event loop keeps serving other requests while the
+    LLM call is in flight.
+    """
+    with stage_timer("cache_lookup"):
+        cache_key = cache_key_for(user_message, nearby_monuments, region)
+        cached_response = RESPONSE_CACHE.get(cache_key)
+    if cached_response is not None:
+        CHAT_ANSWERS.inc("cache_hit")
+        return {
+            "response": cached_response,
+            "ai_powered": True
+        }
+    
+    groq_chat = get_async_groq_chat()
+    if groq_chat is not None and GROQ_BREAKER.rejecting():
+        # Groq is down or rate limited: go straight to the rules
+        CHAT_ANSWERS.inc("circuit_open")
+    elif groq_chat is not None:
+        # Join an identical question already waiting on Groq, or start the call
+        flight, started = CHAT_FLIGHTS.join(
+            cache_key,
+            lambda flight: _fetch_groq_answer(groq_chat, user_message, nearby_monuments,
+                                              prompt_template_for(region), passages, cache_key, flight)
+        )
+        if not started:
+            CHAT_ANSWERS.inc("coalesced")
         
+        groq_response = await flight.result()
         if groq_response is not None:
             return {
                 "response": groq_response,
                 "ai_powered": True
             }
-    except Exception:
-        # If Groq initialization fails, fall through to rule-based
-        pass
     
     # Fall back to rule-based chat
-    rule_chat = RuleBasedChat()
-    rule_response = rule_chat.get_response(user_message, nearby_monuments)
+    rule_response = _rule_fallback(user_message, nearby_monuments, rule_chat, passages)
     
     return {
         "response": rule_response,
         "ai_powered": False
-    }
\ No newline at end of file
+    }
+
+async def stream_chat_response(user_message: str, nearby_monuments: list, lat: float, lon: float,
+                               rule_chat: Optional[RuleBasedChat] = None,
+                               region: Optional[Region] = None,
+                               passages: Sequence[Passage] = ()) -> AsyncIterator[Tuple[str, bool]]:
+    """
+    Streaming variant of get_chat_response_async. Yields (text, ai_powered)
+    chunks: a cached answer as a single chunk, Groq tokens as they arrive,
+    or the whole rule-based answer as a single chunk if Groq produces nothing.
+    """
+    with stage_timer("cache_lookup"):
+        cache_key = cache_key_for(user_message, nearby_monuments, region)
+        cached_response = RESPONSE_CACHE.get(cache_key)
+    if cached_response is not None:
+        CHAT_ANSWERS.inc("cache_hit")
+        yield cached_response, True
+        return
+    
+    groq_chat = get_async_groq_chat()
+    if groq_chat is not None and GROQ_BREAKER.rejecting():
+        CHAT_ANSWERS.inc("circuit_open")
+    elif groq_chat is not None:
+        # Identical questions in flight share one Groq stream; late joiners replay it from the start
+        flight, started = CHAT_FLIGHTS.join(
+            cache_key,
+            lambda flight: _stream_groq_answer(groq_chat, user_message, nearby_monuments,
+                                               prompt_template_for(region), passages, cache_key, flight)
+        )
+        if not started:
+            CHAT_ANSWERS.inc("coalesced")
+        
+        streamed_any = False
+        try:
+            async for token in flight.follow():
+                streamed_any = True
+                yield token, True
+        except BrokenFlight:
+            # Stream broke mid-answer: keep what was sent
+            return
+        
+        if streamed_any:
+            return
+    
+    # Fall back to rule-based chat
+    yield _rule_fallback(user_message, nearby_monuments, rule_chat, passages), False
@@ -0,0 +1,173 @@
+import email.utils
+import threading
+import time
+from collections import deque
+from typing import Callable, Mapping, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """
+    The circuit breaker refused the call; the upstream was never contacted
+    """
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """
+    Seconds to wait from retry-after-ms / Retry-After (seconds or HTTP date), or None
+    """
+    if headers is None:
+        return None
+
+    retry_ms = headers.get("retry-after-ms")
+    if retry_ms is not None:
+        try:
+            return max(0.0, float(retry_ms) / 1000)
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after is None:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+
+    retry_date = email.utils.parsedate_tz(retry_after)
+    if retry_date is None:
+        return None
+    return max(0.0, email.utils.mktime_tz(retry_date) - time.time())
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker for calls to an upstream service.
+
+    Closed: calls go through, and failures within window_seconds are counted.
+    failure_threshold of them (or one rate-limit response) opens the circuit.
+    Open: allow() refuses every call until open_seconds (or the upstream's
+    Retry-After, capped at max_open_seconds) have passed.
+    Half-open: up to half_open_max_calls probe calls go through; a success
+    closes the circuit, a failure opens it again.
+
+    Every call that allow() let through must end in exactly one of
+    record_success, record_failure or record_neutral.
+    """
+
+    def __init__(self, failure_threshold: int = 5, window_seconds: float = 30,
+                 open_seconds: float = 30, max_open_seconds: float = 300,
+                 half_open_max_calls: int = 1, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
+
+        self.state = CLOSED
+        self.opened_count = 0
+        self._open_until = 0.0
+        self._failures = deque()  # timestamps of recent failures while closed
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def _trim_failures(self, now: float):
+        while self._failures and self._failures[0] <= now - self.window_seconds:
+            self._failures.popleft()
+
+    def _open(self, now: float, retry_after: Optional[float]):
+        duration = self.open_seconds if retry_after is None else retry_after
+        self.state = OPEN
+        self.opened_count += 1
+        self._open_until = now + min(duration, self.max_open_seconds)
+        self._failures.clear()
+        self._probes = 0
+
+    def rejecting(self) -> bool:
+        """
+        True if allow() would refuse a call right now (no state change)
+        """
+        with self._lock:
+            if self.state == OPEN:
+                return self.clock() < self._open_until
+            if self.state == HALF_OPEN:
+                return self._probes >= self.half_open_max_calls
+            return False
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go to the upstream now
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if self.clock() < self._open_until:
+                    return False
+                self.state = HALF_OPEN
+                self._probes = 0
+            if self._probes >= self.half_open_max_calls:
+                return False
+            self._probes += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self._probes = 0
+            self._failures.clear()
+
+    def record_failure(self, retry_after: Optional[float] = None):
+        """
+        A failed call. retry_after (seconds) marks a rate-limit response,
+        which opens the circuit straight away for that long. Calls that were
+        already in flight when the circuit opened only push its reopening
+        later; they don't count as another opening.
+        """
+        with self._lock:
+            now = self.clock()
+            if self.state == OPEN:
+                if retry_after is not None:
+                    self._open_until = max(self._open_until, now + min(retry_after, self.max_open_seconds))
+                return
+            if self.state == HALF_OPEN or retry_after is not None:
+                self._open(now, retry_after)
+                return
+            self._failures.append(now)
+            self._trim_failures(now)
+            if len(self._failures) >= self.failure_threshold:
+                self._open(now, None)
+
+    def record_neutral(self):
+        """
+        A call that says nothing about upstream health (e.g. a bad request,
+        or given up before it was sent); frees its half-open probe slot
+        """
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def retry_in(self) -> float:
+        """
+        Seconds until an open circuit lets a probe through (0 if not open)
+        """
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self._open_until - self.clock())
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = self.clock()
+            self._trim_failures(now)
+            return {
+                "state": self.state,
+                "recent_failures": len(self._failures),
+                "retry_in_seconds": round(max(0.0, self._open_until - now), 1) if self.state == OPEN else 0.0,
+                "times_opened": self.opened_count
+            }
@@ -0,0 +1,323 @@
+import hashlib
+import json
+import mmap
+import os
+from collections.abc import Mapping, Sequence
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from retrieval import PassageIndex
+
+import numpy as np
+
+MAGIC = b"DISHAPK1"
+FORMAT_VERSION = 3
+PACK_FILE = "disha_data.pack"
+
+# Sections are aligned so NumPy can view them in place
+ALIGNMENT = 8
+
+
+def source_stamps(*paths: str) -> List[List[int]]:
+    """
+    [mtime_ns, size] of each source file, a cheap first staleness check
+    """
+    stamps = []
+    for path in paths:
+        stat = os.stat(path)
+        stamps.append([stat.st_mtime_ns, stat.st_size])
+    return stamps
+
+
+def source_hash(*paths: str) -> str:
+    """
+    Content hash of the source JSON files a pack was built from
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class PackedBlobs(Sequence):
+    """
+    Variable-length byte records stored back to back, read from the mapped
+    file on access
+    """
+
+    def __init__(self, offsets: np.ndarray, blob: memoryview):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return bytes(self.blob[int(self.offsets[idx]):int(self.offsets[idx + 1])])
+
+
+class PackedRecords(Sequence):
+    """
+    JSON records decoded on first access and kept; untouched records are
+    never parsed. decoded seeds the records already parsed elsewhere, until
+    release() drops them.
+    """
+
+    def __init__(self, blobs: Sequence[bytes], convert: Optional[Callable] = None,
+                 decoded: Optional[Sequence] = None):
+        self.blobs = blobs
+        self.convert = convert
+        self._decoded: Dict[int, object] = dict(enumerate(decoded)) if decoded is not None else {}
+
+    def release(self):
+        """
+        Forget every decoded record; they are decoded again when next read
+        """
+        self._decoded = {}
+
+    def __len__(self) -> int:
+        return len(self.blobs)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        record = self._decoded.get(idx)
+        if record is None:
+            record = json.loads(self.blobs[idx])
+            if self.convert is not None:
+                record = self.convert(record)
+            self._decoded[idx] = record
+        return record
+
+
+class PackedMapping(Mapping):
+    """
+    Read-only id -> value mapping whose values are built on first access
+    """
+
+    def __init__(self, position: Dict[str, int], factory: Callable[[int], object]):
+        self.position = position
+        self.factory = factory
+        self._values: Dict[str, object] = {}
+
+    def __getitem__(self, key):
+        value = self._values.get(key)
+        if value is None:
+            value = self._values[key] = self.factory(self.position[key])
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.position)
+
+    def __len__(self) -> int:
+        return len(self.position)
+
+    def __contains__(self, key) -> bool:
+        return key in self.position
+
+
+def cell_key(row: int, col: int) -> int:
+    """
+    One int64 per grid cell that sorts like (row, col)
+    """
+    return row * (1 << 32) + (col + (1 << 31))
+
+
+def cell_from_key(key: int) -> Tuple[int, int]:
+    return key // (1 << 32), key % (1 << 32) - (1 << 31)
+
+
+class PackedCells(Mapping):
+    """
+    GeoGridIndex cells, (row, col) -> monument indexes, looked up by binary
+    search over the sorted cell keys instead of being loaded into a dict
+    """
+
+    def __init__(self, keys: np.ndarray, offsets: np.ndarray, members: np.ndarray):
+        self.keys = keys          # sorted cell_key() values
+        self.offsets = offsets    # (cells + 1) uint64
+        self.members = members    # uint32 monument indexes
+
+    @classmethod
+    def from_coordinates(cls, latitudes: np.ndarray, longitudes: np.ndarray, cell_deg: float) -> "PackedCells":
+        """
+        Cells of a GeoGridIndex over these points (same cells as GeoGridIndex
+        would build), computed in one vectorized pass
+        """
+        keys = np.floor(latitudes / cell_deg).astype(np.int64) * (1 << 32) + (
+            np.floor(longitudes / cell_deg).astype(np.int64) + (1 << 31)
+        )
+        members = np.argsort(keys, kind="stable").astype(np.uint32)
+        cell_keys, counts = np.unique(keys[members], return_counts=True)
+        offsets = np.zeros(len(cell_keys) + 1, dtype=np.uint64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(cell_keys, offsets, members)
+
+    def _members(self, pos: int) -> List[int]:
+        return self.members[int(self.offsets[pos]):int(self.offsets[pos + 1])].tolist()
+
+    def __getitem__(self, cell: Tuple[int, int]) -> List[int]:
+        key = cell_key(*cell)
+        pos = int(np.searchsorted(self.keys, key))
+        if pos == len(self.keys) or self.keys[pos] != key:
+            raise KeyError(cell)
+        return self._members(pos)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return (cell_from_key(int(key)) for key in self.keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def items(self):
+        return ((cell_from_key(int(self.keys[pos])), self._members(pos)) for pos in range(len(self.keys)))
+
+
+class PackedSubset(Sequence):
+    """
+    The records at the given indexes of another sequence, without copying
+    or decoding them
+    """
+
+    def __init__(self, records: Sequence, indices: np.ndarray):
+        self.records = records
+        self.indices = indices
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        return self.records[int(self.indices[idx])]
+
+
+def blob_section(records: Sequence[bytes]) -> Tuple[bytes, bytes]:
+    """
+    (offsets section, data section) for variable-length records
+    """
+    offsets = np.zeros(len(records) + 1, dtype=np.uint64)
+    np.cumsum([len(record) for record in records], out=offsets[1:])
+    return offsets.tobytes(), b"".join(records)
+
+
+def write_pack(path: str, sections: Dict[str, bytes], header: dict):
+    """
+    Write named byte sections and a JSON header atomically to path
+    """
+    layout = {}
+    offset = 0
+    for name, data in sections.items():
+        layout[name] = [offset, len(data)]
+        offset += len(data) + (-len(data) % ALIGNMENT)
+    header = dict(header, format=FORMAT_VERSION, sections=layout)
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    header_bytes += b" " * (-(len(MAGIC) + 8 + len(header_bytes)) % ALIGNMENT)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header_bytes).to_bytes(8, "little"))
+        f.write(header_bytes)
+        for data in sections.values():
+            f.write(data)
+            f.write(b"\0" * (-len(data) % ALIGNMENT))
+    os.replace(tmp_path, path)
+
+
+class DataPack:
+    """
+    A pack file mapped read-only. Worker processes mapping the same file share
+    its pages through the OS page cache; arrays are NumPy views into the
+    mapping and records are decoded only when first used.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a data pack")
+        header_len = int.from_bytes(self._mmap[len(MAGIC):len(MAGIC) + 8], "little")
+        body_start = len(MAGIC) + 8 + header_len
+        self.header = json.loads(self._mmap[len(MAGIC) + 8:body_start])
+        if self.header.get("format") != FORMAT_VERSION:
+            raise ValueError(f"{path} has pack format {self.header.get('format')}, expected {FORMAT_VERSION}")
+        self._body_start = body_start
+        self._view = memoryview(self._mmap)
+
+        self.source_hash: str = self.header["source_hash"]
+        self.source_stamps: List[List[int]] = self.header.get("source_stamps", [])
+        self.cell_deg: float = self.header["cell_deg"]
+        self.ids: List[str] = self.header["ids"]
+        self.field_names = set(self.header["field_names"])
+        self.position: Dict[str, int] = {monument_id: idx for idx, monument_id in enumerate(self.ids)}
+
+        self.latitudes = self._array("latitudes", np.float64)
+        self.longitudes = self._array("longitudes", np.float64)
+        self.cells = PackedCells(
+            self._array("cell_keys", np.int64),
+            self._array("cell_offsets", np.uint64),
+            self._array("cell_members", np.uint32)
+        )
+
+        # NeighbourGraph CSR arrays: indptr, neighbours, distances
+        self.graph = (
+            self._array("graph_indptr", np.uint64),
+            self._array("graph_neighbours", np.uint32),
+            self._array("graph_distances", np.float64)
+        )
+
+        self.monument_bytes = self._blobs("monuments")
+        self.summary_bytes = self._blobs("summaries")
+        self.monuments = PackedRecords(self.monument_bytes)
+        self.rule_answers = PackedMapping(self.position, PackedRecords(self._blobs("rule_answers")).__getitem__)
+        warnings = PackedRecords(self._blobs("monument_warnings"), convert=tuple)
+        self.monument_warnings = PackedMapping(self.position, warnings.__getitem__)
+        self.safety_data: dict = json.loads(bytes(self._section("safety")))
+        # Contents of the regions file the pack was built with (None without one)
+        self.regions_data: Optional[dict] = self.header.get("regions")
+
+    def _section(self, name: str) -> memoryview:
+        offset, length = self.header["sections"][name]
+        start = self._body_start + offset
+        return self._view[start:start + length]
+
+    def _array(self, name: str, dtype) -> np.ndarray:
+        return np.frombuffer(self._section(name), dtype=dtype)
+
+    def _blobs(self, name: str) -> PackedBlobs:
+        return PackedBlobs(self._array(f"{name}_offsets", np.uint64), self._section(name))
+
+    def retrieval(self, region_id: str, monuments: Sequence) -> PassageIndex:
+        """
+        The passage index build_data_pack.py stored for a region's shard
+        (monuments being that shard's monuments)
+        """
+        prefix = f"retrieval_{region_id}_"
+        return PassageIndex(
+            monuments,
+            self._blobs(f"{prefix}terms"),
+            self._array(f"{prefix}indptr", np.uint64),
+            self._array(f"{prefix}postings", np.uint32),
+            self._array(f"{prefix}impacts", np.float32),
+            self._array(f"{prefix}passage_monuments", np.uint32),
+            self._array(f"{prefix}passage_fields", np.uint8)
+        )
+
+    def all_body(self) -> Tuple[memoryview, memoryview, str]:
+        """
+        (body, gzip variant, ETag) of the full /api/monuments/all response,
+        served straight from the mapping rather than copied per worker
+        """
+        return self._section("all_body"), self._section("all_body_gzip"), self.header["all_body_etag"]
@@ -0,0 +1,384 @@
+import asyncio
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+from catalogue import CatalogueResponses, EncodedBody, encode_json
+from chat_engine import RuleBasedChat
+from data_pack import PACK_FILE, DataPack, PackedCells, PackedRecords, PackedSubset, source_hash, source_stamps
+from geo_index import ROUNDING_SLACK_KM, CoordinateColumns, GeoGridIndex, NeighbourGraph, bounding_box
+from geofence import SafetyTipResolver
+from monument_store import DISTANCE_FIELD, MonumentStore
+from retrieval import PassageIndex
+from regions import DEFAULT_REGION, Region, RegionRouter, area_point, parse_regions, partition
+
+# Data files live next to the code unless DISHA_DATA_DIR says otherwise
+DATA_DIR = os.getenv("DISHA_DATA_DIR", os.path.dirname(os.path.abspath(__file__)))
+MONUMENTS_FILE = "monuments_data.json"
+SAFETY_FILE = "safety_data.json"
+# Monument graph: each monument's nearest others (up to this many) within this radius
+NEIGHBOUR_RADIUS_KM = 5.0
+NEIGHBOURS_PER_MONUMENT = 8
+# Closest monuments named in rule-based directions answers
+DIRECTIONS_NEIGHBOURS = 3
+# Optional: cities served from their own shards (everything is one default region without it)
+REGIONS_FILE = "regions_data.json"
+# Binary pack built by build_data_pack.py; defaults to <data dir>/disha_data.pack,
+# set DISHA_DATA_PACK to another path, or to an empty string to always read JSON
+DATA_PACK = os.getenv("DISHA_DATA_PACK")
+
+
+class RegionShard:
+    """
+    One region's share of the data: the monuments and safety zones inside its
+    bounding box, with the spatial indexes, safety tips and rule engine built
+    over just those. Requests are routed to a single shard, so their cost
+    follows the size of one city, not of the whole catalogue.
+    """
+
+    def __init__(self, region: Region, monuments: Sequence[dict], safety_data: dict,
+                 pack: Optional[DataPack] = None, indices: Optional[np.ndarray] = None,
+                 neighbours: Optional[Callable[[str], List[Tuple[str, float]]]] = None):
+        self.region = region
+        self.monuments = monuments
+        self.safety_data = safety_data
+
+        if pack is not None:
+            # Built from the pack's coordinate columns, without decoding any monument
+            if len(indices) == len(pack.ids):
+                latitudes, longitudes, cells = pack.latitudes, pack.longitudes, pack.cells
+            else:
+                latitudes, longitudes = pack.latitudes[indices], pack.longitudes[indices]
+                cells = PackedCells.from_coordinates(latitudes, longitudes, pack.cell_deg)
+            self.monument_index = GeoGridIndex(monuments, cell_deg=pack.cell_deg, cells=cells)
+            self.monument_columns = CoordinateColumns(monuments, latitudes, longitudes)
+            # Rendered with each monument's region texts by build_data_pack.py
+            self.rule_chat = RuleBasedChat(answers=pack.rule_answers, texts=region.rule_texts)
+            self.safety = SafetyTipResolver(safety_data, monument_warnings=pack.monument_warnings)
+            self.retrieval = pack.retrieval(region.id, monuments)
+        else:
+            # Spatial index over monuments, so nearby lookups skip the full scan
+            self.monument_index = GeoGridIndex(monuments)
+            # Column arrays of monument coordinates for vectorized batch queries
+            self.monument_columns = CoordinateColumns(monuments)
+            # Rule-based fallback with answers pre-rendered for every monument
+            self.rule_chat = RuleBasedChat(monuments, texts=region.rule_texts, neighbours=neighbours)
+            # Geofenced safety zones with cached tip lists per zone combination
+            self.safety = SafetyTipResolver(safety_data, monuments)
+            # BM25 index over monument text, for questions about places that aren't nearby
+            self.retrieval = PassageIndex.build(monuments)
+
+
+class DataSnapshot:
+    """
+    Immutable view of the loaded data and every index derived from it.
+
+    A request reads DataStore.snapshot once and uses that object throughout,
+    so a reload that swaps in a new snapshot mid-request is never observed.
+    Treat every attribute as read-only.
+
+    Location-based lookups go through shard_at(), which picks the RegionShard
+    containing the point, except nearby-monument searches: within() and
+    within_many() search every shard the query circle reaches. The catalogue
+    endpoints and nearby-result encoding stay global.
+    """
+
+    def __init__(self, monuments: Sequence[dict], safety_data: dict, version: int,
+                 regions: Sequence[Region] = (), pack: Optional[DataPack] = None,
+                 source_hash: Optional[str] = None):
+        self.version = version
+        # Content hash of the JSON files this was built from; unlike version,
+        # the same across restarts and workers for the same data
+        self.source_hash = source_hash
+        self.loaded_at = datetime.now().isoformat()
+        self.monuments = monuments
+        self.safety_data = safety_data
+        self.source = "pack" if pack is not None else "json"
+
+        if pack is not None:
+            # Everything below was precomputed by build_data_pack.py; monuments
+            # are decoded lazily, so startup doesn't grow with the catalogue
+            self.monument_store = MonumentStore(
+                monuments,
+                position=pack.position,
+                item_bytes=pack.monument_bytes,
+                summary_bytes=pack.summary_bytes,
+                field_names=pack.field_names
+            )
+            body, gzip_body, etag = pack.all_body()
+            self.catalogue = CatalogueResponses(
+                monuments,
+                item_bytes=pack.monument_bytes,
+                position=pack.position,
+                field_names=pack.field_names - {DISTANCE_FIELD},
+                all_body=EncodedBody(body, etag=etag, variants={"gzip": gzip_body})
+            )
+            latitudes, longitudes = pack.latitudes, pack.longitudes
+            self.graph = NeighbourGraph(latitudes, longitudes, *pack.graph)
+        else:
+            # Each monument is encoded once and from then on read back from its
+            # bytes, as from a data pack: the parsed dicts seed the records
+            # while the indexes below are built, and are released at the end
+            item_bytes = [encode_json(monument) for monument in monuments]
+            latitudes = np.array([monument['latitude'] for monument in monuments], dtype=np.float64)
+            longitudes = np.array([monument['longitude'] for monument in monuments], dtype=np.float64)
+            monuments = self.monuments = PackedRecords(item_bytes, decoded=monuments)
+            # Summaries and pre-encoded monuments for nearby-search responses
+            self.monument_store = MonumentStore(monuments, item_bytes=item_bytes)
+            # Id index and pre-encoded JSON bodies for the catalogue endpoints
+            self.catalogue = CatalogueResponses(
+                monuments,
+                item_bytes=item_bytes,
+                position=self.monument_store.position,
+                field_names=self.monument_store.field_names - {DISTANCE_FIELD}
+            )
+            # Distances from each monument to its closest others, for itineraries and directions
+            self.graph = NeighbourGraph.build(latitudes, longitudes, NEIGHBOUR_RADIUS_KM, NEIGHBOURS_PER_MONUMENT)
+
+        # One shard per region plus a last, default one for everything outside them
+        self.router = RegionRouter(regions)
+        region_list = list(regions) + [DEFAULT_REGION]
+        zones_by_region: List[List[dict]] = [[] for _ in region_list]
+        for area in safety_data.get('area_specific', []):
+            zones_by_region[self.router.region_index(*area_point(area))].append(area)
+
+        self.shards: List[RegionShard] = []
+        for region, indices, zones in zip(region_list, partition(regions, latitudes, longitudes), zones_by_region):
+            shard_monuments = monuments if len(indices) == len(monuments) else PackedSubset(monuments, indices)
+            shard_safety = dict(safety_data, area_specific=zones)
+            self.shards.append(RegionShard(region, shard_monuments, shard_safety, pack, indices,
+                                           neighbours=self.nearby_attractions))
+
+        # Location-independent safety blocks, cacheable by clients on their own
+        self.safety_static = EncodedBody(encode_json({
+            "success": True,
+            "emergency_contacts": safety_data.get('emergency_contacts', {}),
+            "transportation_scams": safety_data.get('transportation_scams', []),
+            "shopping_scams": safety_data.get('shopping_scams', [])
+        }))
+
+        if pack is None:
+            # Memory now follows what requests read, not the whole catalogue
+            monuments.release()
+
+    def nearby_attractions(self, monument_id: str, limit: int = DIRECTIONS_NEIGHBOURS) -> List[Tuple[str, float]]:
+        """
+        (name, distance_km) of the monuments closest to this one, from the graph
+        """
+        idx = self.monument_store.position[monument_id]
+        return [(self.monuments[other]['name'], km) for other, km in self.graph.neighbours_of(idx)[:limit]]
+
+    def shard_at(self, lat: float, lon: float) -> RegionShard:
+        """
+        The shard serving requests at this point
+        """
+        return self.shards[self.router.region_index(lat, lon)]
+
+    def _shard_indexes_near(self, lat: float, lon: float, radius_km: float) -> List[int]:
+        """
+        Positions of the shards that may hold monuments within radius_km of
+        the point: a circle near a region's edge reaches into its neighbours
+        """
+        return self.router.region_indexes_near(bounding_box(lat, lon, radius_km + ROUNDING_SLACK_KM))
+
+    def _merge(self, parts: List[List[Tuple[float, dict]]]) -> List[Tuple[float, dict]]:
+        """
+        Matches from several shards in one list, ordered as a single index
+        over the whole catalogue would order them (ties in catalogue order)
+        """
+        if len(parts) == 1:
+            return parts[0]
+        position = self.monument_store.position
+        merged = [match for part in parts for match in part]
+        merged.sort(key=lambda pair: (pair[0], position[pair[1]['id']]))
+        return merged
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[float, dict]]:
+        """
+        GeoGridIndex.within over every shard the circle reaches
+        """
+        return self._merge([
+            self.shards[idx].monument_index.within(lat, lon, radius_km)
+            for idx in self._shard_indexes_near(lat, lon, radius_km)
+        ])
+
+    def within_many(self, queries: Sequence[Tuple[float, float, float]]) -> List[List[Tuple[float, dict]]]:
+        """
+        CoordinateColumns.within_many for queries that may reach into
+        different regions: each shard answers the queries reaching it in one
+        vectorized pass
+        """
+        by_shard: Dict[int, List[int]] = {}
+        for position, (lat, lon, radius_km) in enumerate(queries):
+            for shard_idx in self._shard_indexes_near(lat, lon, radius_km):
+                by_shard.setdefault(shard_idx, []).append(position)
+
+        parts: List[List[List[Tuple[float, dict]]]] = [[] for _ in queries]
+        for shard_idx, positions in sorted(by_shard.items()):
+            found = self.shards[shard_idx].monument_columns.within_many([queries[pos] for pos in positions])
+            for position, matches in zip(positions, found):
+                parts[position].append(matches)
+        return [self._merge(part) for part in parts]
+
+
+def validate_data(monuments, safety_data):
+    """
+    Raise ValueError if the loaded JSON doesn't have the shape the API relies on
+    """
+    if not isinstance(monuments, list) or not isinstance(safety_data, dict):
+        raise ValueError("monuments file must hold a list and safety file an object")
+    seen_ids = set()
+    for monument in monuments:
+        missing = [key for key in ('id', 'name', 'latitude', 'longitude', 'category') if key not in monument]
+        if missing:
+            raise ValueError(f"monument {monument.get('id', '?')} is missing {', '.join(missing)}")
+        if monument['id'] in seen_ids:
+            raise ValueError(f"duplicate monument id {monument['id']}")
+        seen_ids.add(monument['id'])
+    for area in safety_data.get('area_specific', []):
+        is_circle = all(key in area for key in ('latitude', 'longitude', 'radius_km'))
+        if not is_circle and len(area.get('polygon', [])) < 3:
+            raise ValueError(f"safety area {area.get('area_name', '?')} needs latitude/longitude/radius_km or a polygon")
+
+
+def _read_json(path: str):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class DataStore:
+    """
+    Holds the current DataSnapshot and rebuilds it when the data files change.
+
+    Reloads build a complete new snapshot off the request path (in a worker
+    thread) and then replace the reference in one assignment. If a reload
+    fails, the previous snapshot stays in place.
+    """
+
+    def __init__(self, data_dir: str = DATA_DIR, pack_path: Optional[str] = DATA_PACK):
+        self.monuments_path = os.path.join(data_dir, MONUMENTS_FILE)
+        self.safety_path = os.path.join(data_dir, SAFETY_FILE)
+        self.regions_path = os.path.join(data_dir, REGIONS_FILE)
+        self.pack_path = os.path.join(data_dir, PACK_FILE) if pack_path is None else pack_path or None
+        self.snapshot: Optional[DataSnapshot] = None
+        self._file_stamps = None
+        self._failed_stamps = None
+        self._reload_lock = threading.Lock()
+
+    def _stamps(self) -> Tuple:
+        stamps = []
+        for path in (self.monuments_path, self.safety_path, self.pack_path, self.regions_path):
+            try:
+                stat = os.stat(path) if path else None
+            except FileNotFoundError:
+                # Either the JSON files or the pack may be absent, not both;
+                # the regions file is optional
+                stat = None
+            stamps.append((stat.st_mtime_ns, stat.st_size) if stat else None)
+        if stamps[2] is None and None in stamps[:2]:
+            raise FileNotFoundError(self.monuments_path if stamps[0] is None else self.safety_path)
+        return tuple(stamps)
+
+    def source_paths(self) -> Tuple[str, ...]:
+        """
+        The JSON files a snapshot (or data pack) is built from
+        """
+        if os.path.exists(self.regions_path):
+            return self.monuments_path, self.safety_path, self.regions_path
+        return self.monuments_path, self.safety_path
+
+    def _open_pack(self) -> Optional[DataPack]:
+        """
+        The data pack, if there is one built from the current JSON files
+        """
+        if not self.pack_path or not os.path.exists(self.pack_path):
+            return None
+        try:
+            pack = DataPack(self.pack_path)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable data pack {self.pack_path} - {e}")
+            return None
+        sources = self.source_paths()
+        if all(os.path.exists(path) for path in sources[:2]):
+            # Unchanged stamps skip hashing the JSON; a touched file is hashed
+            if pack.source_stamps != source_stamps(*sources) and pack.source_hash != source_hash(*sources):
+                print(f"Warning: Data pack {self.pack_path} is older than the JSON files; "
+                      f"reading JSON (re-run build_data_pack.py)")
+                return None
+        return pack
+
+    def files_changed(self) -> bool:
+        try:
+            stamps = self._stamps()
+            # Don't retry a broken file until it is written again
+            return stamps != self._file_stamps and stamps != self._failed_stamps
+        except OSError:
+            # Mid-write or temporarily missing; check again next time
+            return False
+
+    def load(self) -> DataSnapshot:
+        """
+        Read the data pack if it is current, else the JSON files, and swap
+        in a freshly built snapshot.
+        Raises FileNotFoundError, or ValueError (incl. json.JSONDecodeError),
+        TypeError or KeyError on malformed data.
+        """
+        with self._reload_lock:
+            stamps = self._stamps()
+            try:
+                version = self.snapshot.version + 1 if self.snapshot else 1
+                pack = self._open_pack()
+                if pack is not None:
+                    # Validated when the pack was built
+                    regions = parse_regions(pack.regions_data)
+                    snapshot = DataSnapshot(pack.monuments, pack.safety_data, version, regions, pack,
+                                            source_hash=pack.source_hash)
+                else:
+                    # Hashed before reading, so an edit in between changes the stamps and reloads
+                    data_hash = source_hash(*self.source_paths())
+                    monuments = _read_json(self.monuments_path)
+                    safety_data = _read_json(self.safety_path)
+                    validate_data(monuments, safety_data)
+                    regions = parse_regions(_read_json(self.regions_path) if os.path.exists(self.regions_path) else None)
+                    snapshot = DataSnapshot(monuments, safety_data, version, regions, source_hash=data_hash)
+            except (ValueError, TypeError, KeyError):
+                self._failed_stamps = stamps
+                raise
+
+            # Single reference assignment: readers see the old or the new snapshot, never a mix
+            self.snapshot = snapshot
+            self._file_stamps = stamps
+            return snapshot
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Rebuild the snapshot if the files changed (or always, with force).
+        Returns True if a new snapshot was swapped in.
+        """
+        if not force and not self.files_changed():
+            return False
+        self.load()
+        return True
+
+    async def watch(self, interval_seconds: float, on_reload=None):
+        """
+        Poll the data files and reload in a worker thread when they change.
+        Runs until cancelled.
+        """
+        while True:
+            await asyncio.sleep(interval_seconds)
+            if not self.files_changed():
+                continue
+            try:
+                if await run_in_threadpool(self.reload):
+                    print(f"Reloaded data: version {self.snapshot.version}, {len(self.snapshot.monuments)} monuments")
+                    if on_reload is not None:
+                        on_reload(self.snapshot)
+            except (OSError, ValueError, TypeError, KeyError) as e:
+                # Keep serving the old snapshot
+                print(f"Error: Data reload failed, keeping version {self.snapshot.version} - {e}")
@@ -107,7 +107,7 @@ async function sendMessage() {
     const loadingId = addMessage('Thinking...', 'bot', true);
 
     try {
-        const response = await fetch(`${API_BASE}/api/chat`, {
+        const response = await fetch(`${API_BASE}/api/chat/stream`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -117,24 +117,71 @@ async function sendMessage() {
             })
         });
 
-        const data = await response.json();
-        
-        // Remove loading message
-        const loadingMsg = document.getElementById(loadingId);
-        if (loadingMsg) loadingMsg.remove();
+        if (!response.ok || !response.body) {
+            throw new Error(`Chat stream failed: ${response.status}`);
+        }
 
-        if (data.success) {
-            addMessage(data.response, 'bot');
-        } else {
+        // Replace the loading message with the first token as soon as it arrives
+        let botText = null;
+        let answer = '';
+
+        await readServerSentEvents(response, (event, data) => {
+            if (event !== 'token') return;
+
+            if (!botText) {
+                const loadingMsg = document.getElementById(loadingId);
+                if (loadingMsg) loadingMsg.remove();
+                addMessage('', 'bot');
+                botText = chatWindow.lastElementChild.querySelector('.text');
+                botText.style.whiteSpace = 'pre-wrap'; // Keep line breaks in streamed text
+            }
+
+            answer += data.text;
+            botText.textContent = answer;
+            chatWindow.scrollTop = chatWindow.scrollHeight;
+        });
+
+        if (!botText) {
+            const loadingMsg = document.getElementById(loadingId);
+            if (loadingMsg) loadingMsg.remove();
             addMessage("Sorry, I'm having trouble connecting right now.", 'bot');
         }
 
     } catch (error) {
         console.error('Chat error:', error);
+        const loadingMsg = document.getElementById(loadingId);
+        if (loadingMsg) loadingMsg.remove();
         addMessage("Network error. Please try again.", 'bot');
     }
 }
 
+// Parse a text/event-stream response body, calling onEvent(event, data) per event
+async function readServerSentEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            if (data) onEvent(event, JSON.parse(data));
+        }
+    }
+}
+
 async function getSafetyTips() {
     if(!currentUserCoords.lat) return alert("Location not found yet.");
     
@@ -202,11 +249,14 @@ function showMonumentModal(monument) {
     document.getElementById('modal-price').textContent = `₹${monument.pricing.indian} (Indian)`;
     document.getElementById('monument-modal').classList.remove('hidden');
     
-    // Play Audio (Synthetic implementation for demo)
+    // Play Audio: the pre-rendered guide if the server has one, else the browser's speech synthesis
     const playBtn = document.getElementById('play-audio-btn');
     playBtn.onclick = () => {
-        const utterance = new SpeechSynthesisUtterance(monument.audio_script);
-        window.speechSynthesis.speak(utterance);
+        const audio = new Audio(`${API_BASE}/api/monument/${encodeURIComponent(monument.id)}/audio`);
+        audio.play().catch(() => {
+            const utterance = new SpeechSynthesisUtterance(monument.audio_script);
+            window.speechSynthesis.speak(utterance);
+        });
     };
 }
 
@@ -0,0 +1,383 @@
+import math
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Earth's radius in kilometers
+EARTH_RADIUS_KM = 6371
+
+# Distances are rounded to 2 decimals before the radius check, so a point whose
+# true distance is just over the radius can still qualify. Pad every cell
+# lookup by this much so the index never misses a point the linear scan finds.
+ROUNDING_SLACK_KM = 0.01
+
+
+def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Calculate the great circle distance between two points on Earth in kilometers
+    """
+    # Convert latitude and longitude from degrees to radians
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+
+    # Haversine formula
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+
+    # Calculate the distance
+    distance = EARTH_RADIUS_KM * c
+
+    return round(distance, 2)
+
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> Optional[Tuple[float, float, float, float]]:
+    """
+    (min_lat, max_lat, min_lon, max_lon) of every point within radius_km of
+    (lat, lon). None if the circle reaches a pole or crosses the antimeridian.
+    """
+    delta = radius_km / EARTH_RADIUS_KM
+    if delta >= math.pi / 2:
+        return None
+
+    dlat = math.degrees(delta)
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        return None
+
+    # Widest longitude span of a spherical cap centred at lat
+    cos_lat = math.cos(math.radians(lat))
+    if math.sin(delta) >= cos_lat:
+        return None
+    dlon = math.degrees(math.asin(math.sin(delta) / cos_lat))
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180 or max_lon > 180:
+        return None
+
+    return min_lat, max_lat, min_lon, max_lon
+
+
+class GeoGridIndex:
+    """
+    Fixed-size lat/lon grid over a list of records with 'latitude' and 'longitude'.
+
+    Built once at startup. Radius and k-nearest queries only look at the cells
+    overlapping the query circle, and return exactly what a full linear scan
+    with haversine_distance would (same distances, same order, ties kept in
+    catalogue order).
+    """
+
+    def __init__(self, items: Iterable[dict], cell_deg: float = 0.02,
+                 cells: Optional[Mapping[Tuple[int, int], List[int]]] = None):
+        self.cell_deg = cell_deg
+        # Sequences (e.g. lazily decoded pack records) are used as they are
+        self.items: Sequence[dict] = items if isinstance(items, Sequence) else list(items)
+
+        # Prebuilt cells (from a data pack) must use the same cell_deg
+        if cells is not None:
+            self.cells = cells
+            return
+
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        for idx, item in enumerate(self.items):
+            key = self._cell(item['latitude'], item['longitude'])
+            self.cells.setdefault(key, []).append(idx)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        """
+        (row, col) of the grid cell containing the point
+        """
+        return self._cell(lat, lon)
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> Optional[List[int]]:
+        """
+        Indexes of items in cells overlapping the circle, in catalogue order.
+        Returns None when the circle is too large for the grid to help.
+        """
+        box = bounding_box(lat, lon, radius_km + ROUNDING_SLACK_KM)
+        if box is None:
+            return None
+        min_lat, max_lat, min_lon, max_lon = box
+
+        row_lo, col_lo = self._cell(min_lat, min_lon)
+        row_hi, col_hi = self._cell(max_lat, max_lon)
+
+        # Scanning the bounding box cell by cell only pays off while it has
+        # fewer cells than there are occupied ones
+        box_cells = (row_hi - row_lo + 1) * (col_hi - col_lo + 1)
+        if box_cells > len(self.cells):
+            candidates = [
+                idx
+                for (row, col), members in self.cells.items()
+                if row_lo <= row <= row_hi and col_lo <= col <= col_hi
+                for idx in members
+            ]
+        else:
+            candidates = []
+            for row in range(row_lo, row_hi + 1):
+                for col in range(col_lo, col_hi + 1):
+                    members = self.cells.get((row, col))
+                    if members:
+                        candidates.extend(members)
+
+        candidates.sort()
+        return candidates
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[float, dict]]:
+        """
+        (distance_km, item) pairs within radius_km, sorted by distance (closest first)
+        """
+        candidates = self._candidates(lat, lon, radius_km)
+        if candidates is None:
+            candidates = range(len(self.items))
+
+        found = []
+        for idx in candidates:
+            item = self.items[idx]
+            distance = haversine_distance(lat, lon, item['latitude'], item['longitude'])
+            if distance <= radius_km:
+                found.append((distance, item))
+
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+    def nearest(self, lat: float, lon: float, k: int = 1,
+                max_radius_km: Optional[float] = None) -> List[Tuple[float, dict]]:
+        """
+        The k closest (distance_km, item) pairs, optionally capped at max_radius_km
+        """
+        if k <= 0 or not self.items:
+            return []
+
+        # Grow the search circle until it holds k items; anything outside it is
+        # farther than everything inside, so the first k are the true k nearest
+        radius_km = self.cell_deg * 111.0
+        half_circumference = math.pi * EARTH_RADIUS_KM
+        while True:
+            if max_radius_km is not None and radius_km >= max_radius_km:
+                return self.within(lat, lon, max_radius_km)[:k]
+            found = self.within(lat, lon, radius_km)
+            if len(found) >= k or radius_km >= half_circumference:
+                return found[:k]
+            radius_km *= 2
+
+
+def haversine_kernel(lats: np.ndarray, lons: np.ndarray,
+                     point_lats: np.ndarray, point_lons: np.ndarray) -> np.ndarray:
+    """
+    Unrounded great circle distances in kilometers between every query
+    (lats[i], lons[i]) and every point, as a (queries, points) matrix.
+    All inputs are in degrees.
+    """
+    lat1 = np.radians(np.asarray(lats, dtype=np.float64))[:, None]
+    lon1 = np.radians(np.asarray(lons, dtype=np.float64))[:, None]
+    lat2 = np.radians(np.asarray(point_lats, dtype=np.float64))[None, :]
+    lon2 = np.radians(np.asarray(point_lons, dtype=np.float64))[None, :]
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class CoordinateColumns:
+    """
+    Monument latitudes and longitudes as NumPy column arrays, for answering
+    many location queries in one vectorized pass.
+    """
+
+    # Upper bound on the size of one distance matrix, to cap memory per pass
+    MAX_MATRIX_CELLS = 1_000_000
+
+    def __init__(self, items: Iterable[dict], latitudes: Optional[np.ndarray] = None,
+                 longitudes: Optional[np.ndarray] = None):
+        self.items: Sequence[dict] = items if isinstance(items, Sequence) else list(items)
+        if latitudes is not None and longitudes is not None:
+            # Prebuilt columns, e.g. views into a memory-mapped data pack
+            self.latitudes = latitudes
+            self.longitudes = longitudes
+            return
+        self.latitudes = np.array([item['latitude'] for item in self.items], dtype=np.float64)
+        self.longitudes = np.array([item['longitude'] for item in self.items], dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def within_many(self, queries: Sequence[Tuple[float, float, float]]) -> List[List[Tuple[float, dict]]]:
+        """
+        For each (lat, lon, radius_km) query, the (distance_km, item) pairs
+        within radius, sorted by distance. Matches GeoGridIndex.within exactly.
+        """
+        results: List[List[Tuple[float, dict]]] = [[] for _ in queries]
+        if not queries or not self.items:
+            return results
+
+        chunk = max(1, self.MAX_MATRIX_CELLS // len(self.items))
+        for start in range(0, len(queries), chunk):
+            block = queries[start:start + chunk]
+            lats = np.fromiter((q[0] for q in block), dtype=np.float64, count=len(block))
+            lons = np.fromiter((q[1] for q in block), dtype=np.float64, count=len(block))
+            radii = np.fromiter((q[2] for q in block), dtype=np.float64, count=len(block))
+
+            distances = haversine_kernel(lats, lons, self.latitudes, self.longitudes)
+            query_rows, point_cols = np.nonzero(distances <= (radii + ROUNDING_SLACK_KM)[:, None])
+
+            # The vectorized pass narrows each query to a handful of hits; those
+            # are re-checked with the scalar formula so rounding agrees exactly
+            # with the single-query endpoint
+            for row, col in zip(query_rows.tolist(), point_cols.tolist()):
+                lat, lon, radius_km = block[row]
+                item = self.items[col]
+                distance = haversine_distance(lat, lon, item['latitude'], item['longitude'])
+                if distance <= radius_km:
+                    results[start + row].append((distance, item))
+
+        for found in results:
+            found.sort(key=lambda pair: pair[0])
+        return results
+
+
+class NeighbourGraph:
+    """
+    Sparse monument-to-monument distance graph in CSR form: for every item,
+    its k nearest other items within radius_km, closest first, with their
+    distances (km, rounded like haversine_distance). Pairs that are not
+    neighbours fall back to the straight-line distance.
+    """
+
+    # Candidate pairs held in memory at once while building
+    MAX_PAIRS_PER_PASS = 2_000_000
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray, indptr: np.ndarray,
+                 neighbours: np.ndarray, distances: np.ndarray):
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.indptr = indptr          # (items + 1) offsets into neighbours / distances
+        self.neighbours = neighbours  # item indexes
+        self.distances = distances    # km
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    @classmethod
+    def build(cls, latitudes: np.ndarray, longitudes: np.ndarray, radius_km: float = 3.0,
+              k: int = 8) -> "NeighbourGraph":
+        """
+        Build the graph in vectorized passes over a grid whose cells are at
+        least radius_km wide, so every neighbour is in one of the 3x3 cells
+        around an item
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        count = len(latitudes)
+        if count == 0:
+            return cls(latitudes, longitudes, np.zeros(1, dtype=np.uint64),
+                       np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.float64))
+
+        # A degree of longitude shrinks towards the poles; size cells for the worst latitude
+        lat_deg = math.degrees(radius_km / EARTH_RADIUS_KM)
+        max_abs_lat = min(float(np.abs(latitudes).max()), 89.0)
+        lon_deg = lat_deg / math.cos(math.radians(max_abs_lat))
+        rows = np.floor(latitudes / lat_deg).astype(np.int64)
+        cols = np.floor(longitudes / lon_deg).astype(np.int64)
+        keys = rows * (1 << 32) + cols
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+
+        # Members of each neighbouring cell, as ranges of the sorted order
+        ranges = []
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                target = keys + d_row * (1 << 32) + d_col
+                ranges.append((np.searchsorted(sorted_keys, target, "left"),
+                               np.searchsorted(sorted_keys, target, "right")))
+        candidates = sum(hi - lo for lo, hi in ranges)
+
+        lat_rad, lon_rad = np.radians(latitudes), np.radians(longitudes)
+        cos_lat = np.cos(lat_rad)
+        found_rows, found_cols, found_dist = [], [], []
+        start = 0
+        while start < count:
+            # As many items as fit the pair budget (at least one)
+            budget = np.cumsum(candidates[start:])
+            end = start + max(1, int(np.searchsorted(budget, cls.MAX_PAIRS_PER_PASS, "right")))
+            pair_rows, pair_cols = [], []
+            for lo, hi in ranges:
+                lengths = (hi - lo)[start:end]
+                total = int(lengths.sum())
+                if not total:
+                    continue
+                owner = np.repeat(np.arange(start, end), lengths)
+                first = np.repeat(lo[start:end] - (np.cumsum(lengths) - lengths), lengths)
+                pair_rows.append(owner)
+                pair_cols.append(order[first + np.arange(total)])
+            start = end
+            if not pair_rows:
+                continue
+
+            pair_rows = np.concatenate(pair_rows)
+            pair_cols = np.concatenate(pair_cols)
+            d_lat = lat_rad[pair_cols] - lat_rad[pair_rows]
+            d_lon = lon_rad[pair_cols] - lon_rad[pair_rows]
+            a = np.sin(d_lat / 2) ** 2 + cos_lat[pair_rows] * cos_lat[pair_cols] * np.sin(d_lon / 2) ** 2
+            distance = np.round(EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0))), 2)
+
+            keep = (pair_rows != pair_cols) & (distance <= radius_km)
+            pair_rows, pair_cols, distance = pair_rows[keep], pair_cols[keep], distance[keep]
+
+            # Closest first within each item, ties in catalogue order; keep k
+            by_row = np.lexsort((pair_cols, distance, pair_rows))
+            pair_rows, pair_cols, distance = pair_rows[by_row], pair_cols[by_row], distance[by_row]
+            row_start = np.searchsorted(pair_rows, pair_rows, "left")
+            keep = np.arange(len(pair_rows)) - row_start < k
+            found_rows.append(pair_rows[keep])
+            found_cols.append(pair_cols[keep])
+            found_dist.append(distance[keep])
+
+        if found_rows:
+            all_rows = np.concatenate(found_rows)
+            neighbours = np.concatenate(found_cols).astype(np.uint32)
+            distances = np.concatenate(found_dist)
+        else:
+            all_rows = np.zeros(0, dtype=np.int64)
+            neighbours = np.zeros(0, dtype=np.uint32)
+            distances = np.zeros(0, dtype=np.float64)
+        indptr = np.zeros(count + 1, dtype=np.uint64)
+        np.cumsum(np.bincount(all_rows, minlength=count), out=indptr[1:])
+        return cls(latitudes, longitudes, indptr, neighbours, distances)
+
+    def neighbours_of(self, idx: int) -> List[Tuple[int, float]]:
+        """
+        (item index, distance_km) of the item's neighbours, closest first
+        """
+        lo, hi = int(self.indptr[idx]), int(self.indptr[idx + 1])
+        return list(zip(self.neighbours[lo:hi].tolist(), self.distances[lo:hi].tolist()))
+
+    def distance(self, i: int, j: int) -> float:
+        """
+        Distance in km between two items: the graph edge if they are
+        neighbours, else the straight-line distance (same value either way)
+        """
+        if i == j:
+            return 0.0
+        lo, hi = int(self.indptr[i]), int(self.indptr[i + 1])
+        hits = np.flatnonzero(self.neighbours[lo:hi] == j)
+        if len(hits):
+            return float(self.distances[lo + hits[0]])
+        return haversine_distance(float(self.latitudes[i]), float(self.longitudes[i]),
+                                  float(self.latitudes[j]), float(self.longitudes[j]))
+
+    def matrix(self, indexes: Sequence[int]) -> np.ndarray:
+        """
+        Dense distance matrix between the given items (e.g. an itinerary's stops)
+        """
+        size = len(indexes)
+        matrix = np.zeros((size, size), dtype=np.float64)
+        for a in range(size):
+            for b in range(a + 1, size):
+                matrix[a, b] = matrix[b, a] = self.distance(indexes[a], indexes[b])
+        return matrix
@@ -0,0 +1,135 @@
+import math
+import threading
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from geo_index import ROUNDING_SLACK_KM, bounding_box, haversine_distance
+
+
+def point_in_polygon(lat: float, lon: float, polygon: Sequence[Sequence[float]]) -> bool:
+    """
+    Even-odd ray casting test. polygon is a list of [lat, lon] vertices;
+    fine for neighbourhood-sized zones where lat/lon is close to planar.
+    """
+    inside = False
+    count = len(polygon)
+    for i in range(count):
+        lat1, lon1 = polygon[i]
+        lat2, lon2 = polygon[i - 1]
+        if (lat1 > lat) != (lat2 > lat):
+            crossing_lon = lon1 + (lat - lat1) * (lon2 - lon1) / (lat2 - lat1)
+            if lon < crossing_lon:
+                inside = not inside
+    return inside
+
+
+def area_bounds(area: dict) -> Optional[Tuple[float, float, float, float]]:
+    """
+    (min_lat, max_lat, min_lon, max_lon) covering an area, or None if unbounded
+    """
+    if 'polygon' in area:
+        lats = [vertex[0] for vertex in area['polygon']]
+        lons = [vertex[1] for vertex in area['polygon']]
+        return min(lats), max(lats), min(lons), max(lons)
+    return bounding_box(area['latitude'], area['longitude'], area['radius_km'] + ROUNDING_SLACK_KM)
+
+
+def area_contains(area: dict, lat: float, lon: float) -> bool:
+    if 'polygon' in area:
+        return point_in_polygon(lat, lon, area['polygon'])
+    # Same rounded-distance check as the original per-request scan
+    return haversine_distance(lat, lon, area['latitude'], area['longitude']) <= area['radius_km']
+
+
+class GeofenceIndex:
+    """
+    Grid index over safety zones: circles (latitude, longitude, radius_km)
+    and polygons (polygon: [[lat, lon], ...]). Each zone is registered in
+    every grid cell its bounding box touches, so a point lookup only tests
+    the few zones registered in its own cell.
+    """
+
+    def __init__(self, areas: Sequence[dict], cell_deg: float = 0.05):
+        self.cell_deg = cell_deg
+        self.areas: List[dict] = list(areas)
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        # Zones too large for the grid (e.g. crossing a pole) are always tested
+        self.unbounded: List[int] = []
+
+        for idx, area in enumerate(self.areas):
+            bounds = area_bounds(area)
+            if bounds is None:
+                self.unbounded.append(idx)
+                continue
+            min_lat, max_lat, min_lon, max_lon = bounds
+            for row in range(self._cell_coord(min_lat), self._cell_coord(max_lat) + 1):
+                for col in range(self._cell_coord(min_lon), self._cell_coord(max_lon) + 1):
+                    self.cells.setdefault((row, col), []).append(idx)
+
+    def _cell_coord(self, degrees: float) -> int:
+        return math.floor(degrees / self.cell_deg)
+
+    def areas_at(self, lat: float, lon: float) -> Tuple[int, ...]:
+        """
+        Indexes of the zones containing the point, in data order
+        """
+        candidates = self.cells.get((self._cell_coord(lat), self._cell_coord(lon)), [])
+        if self.unbounded:
+            candidates = sorted(set(candidates).union(self.unbounded))
+        return tuple(idx for idx in candidates if area_contains(self.areas[idx], lat, lon))
+
+
+class SafetyTipResolver:
+    """
+    Resolves location-based safety tips with a geofence lookup. The
+    de-duplicated tip list for each combination of zones is built once and
+    cached, and monument warnings are pre-rendered per monument.
+    """
+
+    # Combinations of overlapping zones actually seen are few, but bound the cache anyway
+    MAX_CACHED_COMBINATIONS = 4096
+
+    def __init__(self, safety_data: dict, monuments: Sequence[dict] = (),
+                 monument_warnings: Optional[Mapping[str, Tuple[str, ...]]] = None):
+        self.general_tips = list(safety_data.get('general_tips', []))
+        self.geofences = GeofenceIndex(safety_data.get('area_specific', []))
+        # monument_warnings may come prebuilt (e.g. rendered into a data pack)
+        self.monument_warnings: Mapping[str, Tuple[str, ...]] = monument_warnings if monument_warnings is not None else {
+            monument['id']: tuple(
+                f"{monument['name']}: {warning}" for warning in monument.get('safety_warnings', [])
+            )
+            for monument in monuments
+        }
+
+        self._tips_by_areas: Dict[Tuple[int, ...], Tuple[str, ...]] = {}
+        self._lock = threading.Lock()
+
+        # Precompute the zone-free list and each single zone
+        self.tips_for_areas(())
+        for idx in range(len(self.geofences.areas)):
+            self.tips_for_areas((idx,))
+
+    def tips_for_areas(self, area_ids: Tuple[int, ...]) -> Tuple[str, ...]:
+        tips = self._tips_by_areas.get(area_ids)
+        if tips is not None:
+            return tips
+
+        combined = list(self.general_tips)
+        for idx in area_ids:
+            combined.extend(self.geofences.areas[idx].get('tips', []))
+        # Remove duplicates while preserving order
+        tips = tuple(dict.fromkeys(combined))
+
+        with self._lock:
+            if len(self._tips_by_areas) >= self.MAX_CACHED_COMBINATIONS:
+                self._tips_by_areas.clear()
+            self._tips_by_areas[area_ids] = tips
+        return tips
+
+    def tips_at(self, lat: float, lon: float) -> Tuple[str, ...]:
+        return self.tips_for_areas(self.geofences.areas_at(lat, lon))
+
+    def warnings_for(self, monument: dict) -> Tuple[str, ...]:
+        warnings = self.monument_warnings.get(monument['id'])
+        if warnings is None:
+            warnings = tuple(f"{monument['name']}: {warning}" for warning in monument.get('safety_warnings', []))
+        return warnings
@@ -2,11 +2,26 @@
 """
 GPS Location Simulator for India Tourism API
 Simulates a tourist walking through Delhi with real GPS coordinates
+
+    python gps_simulator.py              # walk one tourist through Delhi (server on port 8001)
+    python gps_simulator.py bench --launch-server --tourists 50 --steps 40
+                                         # load test with a stubbed Groq, results saved as JSON
 """
 
-import requests
+import argparse
 import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
 
 # API endpoint
 API_BASE = "http://localhost:8001"
@@ -88,7 +103,285 @@ def test_safety_by_area():
                 if len(tip) < 80:  # Show shorter tips
                     print(f"   ⚠️  {tip}")
 
+# --- Load testing ---
+
+ENDPOINTS = ["/api/check-location", "/api/safety-tips", "/api/chat"]
+
+CHAT_QUESTIONS = [
+    "What's nearby?",
+    "How much is the ticket?",
+    "Tell me about the history of this place",
+    "Is it safe here?",
+    "What are the opening hours?",
+    "Where can I eat?",
+    "Hello!"
+]
+
+# Metres per degree of latitude (longitude shrinks with cos(latitude))
+METRES_PER_DEGREE = 111_320
+
+class StubGroqHandler(BaseHTTPRequestHandler):
+    """Answers Groq chat completion calls locally, after a fixed delay"""
+    latency_seconds = 0.3
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.latency_seconds)
+
+        answer = "This is a stubbed tour guide answer for load testing."
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for word in answer.split(" "):
+                chunk = {
+                    "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+                    "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            # Like Groq, report usage on a final chunk
+            final = {
+                "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "x_groq": {"id": "stub", "usage": {"prompt_tokens": 150, "completion_tokens": 12, "total_tokens": 162}}
+            }
+            self.wfile.write(f"data: {json.dumps(final)}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+
+        payload = json.dumps({
+            "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 150, "completion_tokens": 12, "total_tokens": 162}
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+def start_stub_groq(port, latency_ms):
+    """Run the stub Groq server in a background thread; returns its base URL"""
+    StubGroqHandler.latency_seconds = latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubGroqHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+def launch_api_server(port, groq_base_url):
+    """Start uvicorn main:app pointed at the stub Groq server and wait for /health"""
+    env = dict(os.environ, GROQ_API_KEY="stub-key", GROQ_BASE_URL=groq_base_url)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env
+    )
+    api_base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            if requests.get(f"{api_base}/health", timeout=1).status_code == 200:
+                return process, api_base
+        except requests.exceptions.ConnectionError:
+            pass
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("API server did not start")
+
+def walk_route(rng, steps, step_metres):
+    """GPS fixes for a tourist walking between random LOCATIONS, with GPS jitter"""
+    names = list(LOCATIONS)
+    here = LOCATIONS[rng.choice(names)]
+    lat, lon = here["lat"], here["lon"]
+    target = None
+    points = []
+
+    while len(points) < steps:
+        if target is None:
+            target = LOCATIONS[rng.choice(names)]
+        dlat_m = (target["lat"] - lat) * METRES_PER_DEGREE
+        dlon_m = (target["lon"] - lon) * METRES_PER_DEGREE * math.cos(math.radians(lat))
+        remaining = math.hypot(dlat_m, dlon_m)
+
+        if remaining <= step_metres:
+            lat, lon, target = target["lat"], target["lon"], None
+        else:
+            lat += dlat_m / remaining * step_metres / METRES_PER_DEGREE
+            lon += dlon_m / remaining * step_metres / (METRES_PER_DEGREE * math.cos(math.radians(lat)))
+
+        # Roughly 5 m of GPS noise
+        points.append((lat + rng.gauss(0, 5 / METRES_PER_DEGREE), lon + rng.gauss(0, 5 / METRES_PER_DEGREE)))
+
+    return points
+
+def run_tourist(api_base, tourist_id, args, results, lock):
+    """One synthetic tourist: check location every fix, safety and chat every few fixes"""
+    rng = random.Random(args.seed * 100_003 + tourist_id)
+    session = requests.Session()
+
+    for step, (lat, lon) in enumerate(walk_route(rng, args.steps, args.step_metres)):
+        calls = [("/api/check-location", {"latitude": lat, "longitude": lon, "radius_km": 1.0})]
+        if step % args.safety_every == 0:
+            calls.append(("/api/safety-tips", {"latitude": lat, "longitude": lon}))
+        if step % args.chat_every == 0:
+            question = rng.choice(CHAT_QUESTIONS)
+            if args.unique_questions:
+                # Defeat the answer cache so every chat reaches the (stub) LLM
+                question = f"{question} ({tourist_id}-{step})"
+            calls.append(("/api/chat", {"user_message": question, "user_latitude": lat, "user_longitude": lon}))
+
+        for endpoint, payload in calls:
+            start = time.perf_counter()
+            try:
+                ok = session.post(f"{api_base}{endpoint}", json=payload, timeout=30).status_code == 200
+            except requests.exceptions.RequestException:
+                ok = False
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with lock:
+                results[endpoint]["latencies_ms"].append(elapsed_ms)
+                if not ok:
+                    results[endpoint]["errors"] += 1
+
+        if args.think_ms:
+            time.sleep(args.think_ms / 1000)
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(results, wall_seconds):
+    summary = {}
+    for endpoint, data in results.items():
+        latencies = sorted(data["latencies_ms"])
+        count = len(latencies)
+        summary[endpoint] = {
+            "requests": count,
+            "errors": data["errors"],
+            "error_rate": round(data["errors"] / count, 4) if count else 0.0,
+            "throughput_rps": round(count / wall_seconds, 2),
+            "p50_ms": round(percentile(latencies, 50), 2) if count else None,
+            "p95_ms": round(percentile(latencies, 95), 2) if count else None,
+            "p99_ms": round(percentile(latencies, 99), 2) if count else None,
+            "max_ms": round(latencies[-1], 2) if count else None
+        }
+    return summary
+
+def print_summary(summary, baseline=None):
+    print(f"\n{'endpoint':22} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    print("-" * 76)
+    for endpoint, stats in summary.items():
+        print(f"{endpoint:22} {stats['requests']:>9} {stats['errors']:>7} {stats['throughput_rps']:>8} "
+              f"{stats['p50_ms']!s:>8} {stats['p95_ms']!s:>8} {stats['p99_ms']!s:>8}")
+        if baseline and endpoint in baseline and baseline[endpoint]["p95_ms"] and stats["p95_ms"]:
+            change = (stats["p95_ms"] - baseline[endpoint]["p95_ms"]) / baseline[endpoint]["p95_ms"] * 100
+            print(f"{'':22} p95 {change:+.1f}% vs baseline ({baseline[endpoint]['p95_ms']} ms)")
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def run_benchmark(args):
+    """Replay concurrent synthetic tourists and report latency per endpoint"""
+    server_process = None
+    api_base = args.api_base
+    if args.launch_server:
+        groq_base_url = start_stub_groq(args.stub_port, args.stub_latency_ms)
+        server_process, api_base = launch_api_server(args.port, groq_base_url)
+        print(f"Started API on {api_base} with stub Groq at {groq_base_url} ({args.stub_latency_ms} ms)")
+
+    results = {endpoint: {"latencies_ms": [], "errors": 0} for endpoint in ENDPOINTS}
+    lock = threading.Lock()
+
+    print(f"Running {args.tourists} tourists x {args.steps} GPS fixes against {api_base} ...")
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.tourists) as pool:
+            futures = [pool.submit(run_tourist, api_base, i, args, results, lock) for i in range(args.tourists)]
+            for future in futures:
+                future.result()
+        wall_seconds = time.perf_counter() - start
+    finally:
+        if server_process is not None:
+            server_process.terminate()
+            server_process.wait()
+
+    summary = summarize(results, wall_seconds)
+    total = sum(stats["requests"] for stats in summary.values())
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["endpoints"]
+    print_summary(summary, baseline)
+    print(f"\n{total} requests in {wall_seconds:.1f}s ({total / wall_seconds:.1f} req/s overall)")
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "git_revision": git_revision(),
+        "parameters": {
+            "tourists": args.tourists,
+            "steps": args.steps,
+            "step_metres": args.step_metres,
+            "safety_every": args.safety_every,
+            "chat_every": args.chat_every,
+            "think_ms": args.think_ms,
+            "unique_questions": args.unique_questions,
+            "stub_latency_ms": args.stub_latency_ms if args.launch_server else None,
+            "seed": args.seed
+        },
+        "wall_seconds": round(wall_seconds, 3),
+        "total_requests": total,
+        "throughput_rps": round(total / wall_seconds, 2),
+        "endpoints": summary
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {args.output}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="GPS simulator and load tester for the tourism API")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("journey", help="Walk one tourist through Delhi (default)")
+
+    bench = subparsers.add_parser("bench", help="Load test with many concurrent synthetic tourists")
+    bench.add_argument("--api-base", default=API_BASE, help="API to test (ignored with --launch-server)")
+    bench.add_argument("--launch-server", action="store_true",
+                       help="Start the API locally against a stub Groq server (no network needed)")
+    bench.add_argument("--port", type=int, default=8011, help="Port for --launch-server")
+    bench.add_argument("--stub-port", type=int, default=0, help="Port for the stub Groq server (0 = any)")
+    bench.add_argument("--stub-latency-ms", type=float, default=300, help="Simulated LLM latency")
+    bench.add_argument("--tourists", type=int, default=50, help="Concurrent synthetic tourists")
+    bench.add_argument("--steps", type=int, default=40, help="GPS fixes per tourist")
+    bench.add_argument("--step-metres", type=float, default=25, help="Distance walked between fixes")
+    bench.add_argument("--safety-every", type=int, default=5, help="Request safety tips every N fixes")
+    bench.add_argument("--chat-every", type=int, default=10, help="Send a chat message every N fixes")
+    bench.add_argument("--think-ms", type=float, default=0, help="Pause between fixes")
+    bench.add_argument("--unique-questions", action="store_true", help="Make every chat message unique")
+    bench.add_argument("--seed", type=int, default=1)
+    bench.add_argument("--output", default="loadtest_results.json", help="Where to save the JSON report")
+    bench.add_argument("--baseline", help="Earlier JSON report to compare p95 latencies against")
+    args = parser.parse_args()
+    if args.command == "bench":
+        for option in ("safety_every", "chat_every"):
+            if getattr(args, option) < 1:
+                bench.error(f"--{option.replace('_', '-')} must be at least 1")
+    return args
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "bench":
+        run_benchmark(args)
+        sys.exit(0)
+
     try:
         # Test if API is running
         response = requests.get(f"{API_BASE}/health")
@@ -0,0 +1,249 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+MINUTES_PER_DAY = 24 * 60
+
+# Stop counts up to this are ordered exactly (Held-Karp); larger sets heuristically
+EXACT_MAX_STOPS = 10
+# Visit length assumed when average_visit_duration can't be read
+DEFAULT_VISIT_MINUTES = 60
+
+_TIME_RANGE = re.compile(r"(\d{1,2})(?::(\d{2}))?\s*([AaPp][Mm])\s*-\s*(\d{1,2})(?::(\d{2}))?\s*([AaPp][Mm])")
+_DAY_RANGE = re.compile(r"(monday|tuesday|wednesday|thursday|friday|saturday|sunday)s?\s+to\s+"
+                        r"(monday|tuesday|wednesday|thursday|friday|saturday|sunday)s?")
+_CLOSED_DAY = re.compile(r"closed\s+(?:on\s+)?(monday|tuesday|wednesday|thursday|friday|saturday|sunday)s?")
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)\s*(hours?|hrs?|minutes?|mins?)?")
+
+
+def _clock_minutes(hour: str, minute: Optional[str], meridiem: str) -> int:
+    hours = int(hour) % 12 + (12 if meridiem.lower() == "pm" else 0)
+    return hours * 60 + int(minute or 0)
+
+
+@lru_cache(maxsize=1024)
+def parse_opening_hours(text: Optional[str]) -> Optional[Tuple[Tuple[Tuple[int, int], ...], ...]]:
+    """
+    Opening intervals per weekday (Monday first), each a tuple of
+    (open, close) minutes after midnight, from text like "Tuesday to Sunday:
+    9:30 AM - 4:30 PM (Closed on Mondays)" or "Daily: 7:00 AM - 12:00 PM,
+    1:30 PM - 6:30 PM". None if the text can't be read (treated as always open).
+    """
+    if not text:
+        return None
+    lower = text.lower()
+    if lower.startswith("24 hours") or "open 24 hours" in lower:
+        return tuple(((0, MINUTES_PER_DAY),) for _ in WEEKDAYS)
+
+    intervals = tuple(
+        (_clock_minutes(h1, m1, p1), _clock_minutes(h2, m2, p2))
+        for h1, m1, p1, h2, m2, p2 in _TIME_RANGE.findall(text)
+    )
+    if not intervals:
+        return None
+
+    open_days = set(range(len(WEEKDAYS)))
+    day_range = _DAY_RANGE.search(lower)
+    if day_range:
+        first, last = WEEKDAYS.index(day_range.group(1)), WEEKDAYS.index(day_range.group(2))
+        open_days = {(first + offset) % 7 for offset in range((last - first) % 7 + 1)}
+    for closed in _CLOSED_DAY.findall(lower):
+        open_days.discard(WEEKDAYS.index(closed))
+
+    return tuple(intervals if day in open_days else () for day in range(len(WEEKDAYS)))
+
+
+@lru_cache(maxsize=1024)
+def parse_visit_minutes(text: Optional[str]) -> int:
+    """
+    Typical visit length in minutes from text like "2-3 hours", "1.5-2 hours"
+    or "45 minutes to 1 hour" (the middle of a range)
+    """
+    if not text:
+        return DEFAULT_VISIT_MINUTES
+    parts = _DURATION_PART.findall(text.lower())
+    if not parts:
+        return DEFAULT_VISIT_MINUTES
+
+    # A unit applies to the bare numbers before it ("2-3 hours")
+    values = []
+    pending = []
+    for number, unit in parts:
+        pending.append(float(number))
+        if unit:
+            scale = 1 if unit.startswith("m") else 60
+            values.extend(value * scale for value in pending)
+            pending = []
+    values.extend(value * 60 for value in pending)
+    return round(sum(values) / len(values))
+
+
+def format_clock(minutes: float) -> str:
+    minutes = int(round(minutes))
+    return f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"
+
+
+def parse_clock(text: str) -> int:
+    """
+    Minutes after midnight from "HH:MM" (24-hour). Raises ValueError.
+    """
+    match = re.fullmatch(r"(\d{1,2}):(\d{2})", text.strip())
+    if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+        raise ValueError(f"expected HH:MM, got {text!r}")
+    return int(match.group(1)) * 60 + int(match.group(2))
+
+
+class ItineraryPlanner:
+    """
+    Orders a set of stops to visit as many of them as possible within a
+    time budget, each during its opening hours, and then finishing earliest.
+
+    Travel minutes come from a distance matrix (see NeighbourGraph.matrix)
+    at a fixed speed; waiting for a place to open is allowed. Up to
+    EXACT_MAX_STOPS stops are solved exactly with Held-Karp dynamic
+    programming over (visited set, last stop) subproblems, memoized as the
+    earliest time each can be reached. Because waiting is allowed, arriving
+    earlier never hurts, so that earliest time is all a subproblem needs.
+    Larger sets use nearest-feasible-stop construction improved by 2-opt.
+    """
+
+    def __init__(self, distances: np.ndarray, visit_minutes: Sequence[int],
+                 windows: Sequence[Optional[Tuple[Tuple[int, int], ...]]],
+                 start_minute: int, end_minute: int, speed_kmh: float,
+                 start_distances: Optional[Sequence[float]] = None):
+        self.distances = distances
+        self.visit_minutes = list(visit_minutes)
+        # None = always open, () = closed all day
+        self.windows = list(windows)
+        self.start_minute = start_minute
+        self.end_minute = end_minute
+        self.speed_kmh = speed_kmh
+        # Distance from the starting point to each stop (None: start at the first stop)
+        self.start_distances = start_distances
+
+    def travel_minutes(self, km: float) -> float:
+        return km / self.speed_kmh * 60
+
+    def _leg(self, previous: Optional[int], stop: int) -> float:
+        if previous is None:
+            return 0.0 if self.start_distances is None else float(self.start_distances[stop])
+        return float(self.distances[previous, stop])
+
+    def visit(self, stop: int, arrive: float) -> Optional[Tuple[float, float]]:
+        """
+        (start, finish) of the earliest visit to stop from arrive on that
+        fits its opening hours and the budget, or None
+        """
+        duration = self.visit_minutes[stop]
+        windows = self.windows[stop]
+        if windows is None:
+            windows = ((0, MINUTES_PER_DAY),)
+        for open_at, close_at in windows:
+            start = max(arrive, open_at)
+            finish = start + duration
+            if finish <= close_at and finish <= self.end_minute:
+                return start, finish
+        return None
+
+    def schedule(self, order: Sequence[int]) -> Optional[List[Tuple[int, float, float, float]]]:
+        """
+        (stop, arrive, start, finish) for visiting stops in order, or None if
+        one of them can't be fitted
+        """
+        plan = []
+        now = float(self.start_minute)
+        previous = None
+        for stop in order:
+            arrive = now + self.travel_minutes(self._leg(previous, stop))
+            visit = self.visit(stop, arrive)
+            if visit is None:
+                return None
+            plan.append((stop, arrive, visit[0], visit[1]))
+            now, previous = visit[1], stop
+        return plan
+
+    def solve(self) -> Tuple[List[int], str]:
+        """
+        (visiting order, solver name); stops that don't fit are left out
+        """
+        if len(self.visit_minutes) <= EXACT_MAX_STOPS:
+            return self._held_karp(), "exact"
+        return self._heuristic(), "heuristic"
+
+    def _held_karp(self) -> List[int]:
+        count = len(self.visit_minutes)
+        # (visited mask, last stop) -> (earliest finish, previous last stop)
+        best: Dict[Tuple[int, int], Tuple[float, Optional[int]]] = {}
+        layer = []
+        for stop in range(count):
+            arrive = self.start_minute + self.travel_minutes(self._leg(None, stop))
+            visit = self.visit(stop, arrive)
+            if visit is not None:
+                best[(1 << stop, stop)] = (visit[1], None)
+                layer.append((1 << stop, stop))
+
+        final = None
+        while layer:
+            # Every state in a layer has visited the same number of stops;
+            # among them prefer the one that finishes first
+            final = min(layer, key=lambda state: best[state][0])
+            next_layer = {}
+            for mask, last in layer:
+                finished = best[(mask, last)][0]
+                for stop in range(count):
+                    if mask & (1 << stop):
+                        continue
+                    visit = self.visit(stop, finished + self.travel_minutes(self.distances[last, stop]))
+                    if visit is None:
+                        continue
+                    state = (mask | (1 << stop), stop)
+                    known = best.get(state)
+                    if known is None or visit[1] < known[0]:
+                        best[state] = (visit[1], last)
+                        next_layer[state] = None
+            layer = list(next_layer)
+
+        order = []
+        state = final
+        while state is not None:
+            mask, last = state
+            order.append(last)
+            previous = best[state][1]
+            state = (mask & ~(1 << last), previous) if previous is not None else None
+        order.reverse()
+        return order
+
+    def _heuristic(self) -> List[int]:
+        remaining = set(range(len(self.visit_minutes)))
+        order: List[int] = []
+        now = float(self.start_minute)
+        previous = None
+        while remaining:
+            # Next: the stop we can be done with soonest
+            options = []
+            for stop in remaining:
+                visit = self.visit(stop, now + self.travel_minutes(self._leg(previous, stop)))
+                if visit is not None:
+                    options.append((visit[1], stop))
+            if not options:
+                break
+            now, stop = min(options)
+            order.append(stop)
+            remaining.discard(stop)
+            previous = stop
+
+        # 2-opt: reverse segments while that still fits and finishes earlier
+        improved = True
+        while improved:
+            improved = False
+            current = self.schedule(order)[-1][3] if order else 0.0
+            for i in range(len(order) - 1):
+                for j in range(i + 2, len(order) + 1):
+                    candidate = order[:i] + order[i:j][::-1] + order[j:]
+                    plan = self.schedule(candidate)
+                    if plan is not None and plan[-1][3] < current - 1e-9:
+                        order, current, improved = candidate, plan[-1][3], True
+        return order
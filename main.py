@@ -1,23 +1,38 @@
+import asyncio
+import hmac
 import json
 import math
 import sys
-from typing import List, Optional
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import List, Optional, Tuple, Union
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
-from chat_engine import get_chat_response
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+from audio_cache import AudioCache
+from bundle import BundleExporter
+from catalogue import CatalogueResponses, EncodedBody, choose_encoding, encode_json, etag_matches
+from chat_engine import GROQ_BREAKER, PROMPT_BUILDER, RESPONSE_CACHE, match_intent, close_async_groq_chat, get_chat_response_async, stream_chat_response
+from data_store import DataSnapshot, DataStore
+from geo_index import haversine_distance
+from itinerary import WEEKDAYS, ItineraryPlanner, format_clock, parse_clock, parse_opening_hours, parse_visit_minutes
+from metrics import REGISTRY, Gauge, RequestMetricsMiddleware, TRACK_UPDATES, SamplingProfiler, register_cache_gauge, stage_timer
+from monument_store import MonumentStore, parse_fields
+from tracking import TrackingSessions
 import os
 
-# Load data at startup
+# Load data at startup (reloadable later without a restart, see DataStore)
+DATA_STORE = DataStore()
 try:
-    with open('monuments_data.json', 'r', encoding='utf-8') as f:
-        MONUMENTS = json.load(f)
-    
-    with open('safety_data.json', 'r', encoding='utf-8') as f:
-        SAFETY_DATA = json.load(f)
-        
-    print(f"Loaded {len(MONUMENTS)} monuments and safety data successfully")
+    DATA_STORE.load()
+    print(f"Loaded {len(DATA_STORE.snapshot.monuments)} monuments and safety data successfully")
+    # Answers persisted by an earlier run only stand if they came from the same data
+    RESPONSE_CACHE.use_data_version(DATA_STORE.snapshot.source_hash)
     
 except FileNotFoundError as e:
     print(f"Error: Required data file not found - {e}")
@@ -25,12 +40,100 @@ except FileNotFoundError as e:
 except json.JSONDecodeError as e:
     print(f"Error: Invalid JSON in data file - {e}")
     sys.exit(1)
+except (ValueError, TypeError, KeyError) as e:
+    print(f"Error: Invalid data file - {e}")
+    sys.exit(1)
+
+# Seconds between checks of the data files for changes (0 disables watching)
+DATA_WATCH_SECONDS = float(os.getenv("DISHA_DATA_WATCH_SECONDS", "0"))
+# Seconds between saves of cached LLM answers to CHAT_CACHE_PATH (0 saves only on shutdown)
+CHAT_CACHE_SAVE_SECONDS = float(os.getenv("CHAT_CACHE_SAVE_SECONDS", "60"))
+# Token required by the admin reload endpoint (endpoint is disabled when unset)
+ADMIN_TOKEN = os.getenv("DISHA_ADMIN_TOKEN")
+
+# Incremental tracking sessions for /api/track
+TRACKING = TrackingSessions(
+    move_threshold_km=float(os.getenv("DISHA_TRACK_MOVE_THRESHOLD_KM", "0.05")),
+    ttl_seconds=float(os.getenv("DISHA_TRACK_SESSION_TTL_SECONDS", "1800")),
+    max_sessions=int(os.getenv("DISHA_TRACK_MAX_SESSIONS", "10000"))
+)
+
+# Pre-rendered audio guides (see build_audio.py)
+AUDIO_CACHE = AudioCache()
+
+# Offline bundle for the mobile app; deltas can be asked from this many earlier versions
+BUNDLES = BundleExporter(history_size=int(os.getenv("DISHA_BUNDLE_HISTORY", "16")))
+
+# Average travel speed between monuments for itineraries (city traffic)
+ITINERARY_SPEED_KMH = float(os.getenv("DISHA_ITINERARY_SPEED_KMH", "15"))
+
+# Opt-in sampling profiler: sample every thread's stack this often (unset = off)
+PROFILER_INTERVAL_MS = os.getenv("DISHA_PROFILER_INTERVAL_MS")
+PROFILER = SamplingProfiler(float(PROFILER_INTERVAL_MS) / 1000) if PROFILER_INTERVAL_MS else None
+
+def cache_stats() -> dict:
+    """
+    Hit/miss statistics of every cache, for /metrics
+    """
+    intent_info = match_intent.cache_info()
+    intent_lookups = intent_info.hits + intent_info.misses
+    return {
+        "chat_answers": RESPONSE_CACHE.stats(),
+        "prompt_context": PROMPT_BUILDER.stats(),
+        "rule_intents": {
+            "hits": intent_info.hits,
+            "misses": intent_info.misses,
+            "hit_ratio": round(intent_info.hits / intent_lookups, 4) if intent_lookups else 0.0
+        }
+    }
+
+register_cache_gauge("hits", "Cache hits since start", cache_stats)
+register_cache_gauge("misses", "Cache misses since start", cache_stats)
+register_cache_gauge("hit_ratio", "Cache hits / lookups since start", cache_stats)
+
+# 1 for the circuit breaker's current state, 0 for the others
+REGISTRY.register(Gauge(
+    "disha_groq_circuit_state", "Groq circuit breaker state (closed, open or half_open)", ["state"],
+    lambda: {(state,): int(GROQ_BREAKER.state == state) for state in ("closed", "open", "half_open")}
+))
+
+def on_data_reload(snapshot: DataSnapshot):
+    # Cached LLM answers and prompt context may quote prices or descriptions that just changed
+    RESPONSE_CACHE.use_data_version(snapshot.source_hash)
+    PROMPT_BUILDER.clear()
+    # Audio may have been rendered for the new scripts in the meantime
+    AUDIO_CACHE.refresh()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    watcher = None
+    if DATA_WATCH_SECONDS > 0:
+        watcher = asyncio.create_task(DATA_STORE.watch(DATA_WATCH_SECONDS, on_reload=on_data_reload))
+    autosave = None
+    if RESPONSE_CACHE.persist_path and CHAT_CACHE_SAVE_SECONDS > 0:
+        autosave = asyncio.create_task(RESPONSE_CACHE.autosave(CHAT_CACHE_SAVE_SECONDS))
+    if PROFILER is not None:
+        PROFILER.start()
+    
+    yield
+    
+    if watcher is not None:
+        watcher.cancel()
+    if autosave is not None:
+        autosave.cancel()
+    if PROFILER is not None:
+        PROFILER.stop()
+    # Release the shared Groq connection pool on shutdown
+    await close_async_groq_chat()
+    # Persist cached LLM answers (no-op unless CHAT_CACHE_PATH is set)
+    await run_in_threadpool(RESPONSE_CACHE.save)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="India Tourism AI Guide Backend",
     description="REST API for Delhi tourism with AI-powered chat and monument information",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -42,87 +145,179 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request: Request, exc: RequestValidationError):
+    """
+    FastAPI's 422 response, except that a NaN or infinite input is echoed
+    back as text: JSON can't encode it, and the default handler would 500
+    """
+    errors = [
+        dict(error, input=str(error['input']))
+        if isinstance(error.get('input'), float) and not math.isfinite(error['input']) else error
+        for error in exc.errors()
+    ]
+    return JSONResponse(status_code=422, content={"detail": jsonable_encoder(errors)})
+
+# Per-route latency histogram and status counts, errors included
+app.add_middleware(RequestMetricsMiddleware)
+
 # Mount Frontend
-app.mount("/web", StaticFiles(directory="frontend", html=True), name="static")
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+app.mount("/web", StaticFiles(directory=FRONTEND_DIR, html=True), name="static")
 
 # Pydantic models
+# Coordinates and distances must be finite: NaN or infinity can't be placed on the grid
 class LocationRequest(BaseModel):
-    latitude: float
-    longitude: float
-    radius_km: float = 0.5
+    latitude: float = Field(..., allow_inf_nan=False)
+    longitude: float = Field(..., allow_inf_nan=False)
+    radius_km: float = Field(0.5, allow_inf_nan=False)
+
+class SafetyTipsRequest(LocationRequest):
+    # Set to false to omit emergency contacts and scam lists (see /api/safety/static)
+    include_static: bool = True
+
+class BatchLocationRequest(BaseModel):
+    queries: List[LocationRequest]
+
+class TrackRequest(LocationRequest):
+    # Omit on the first fix; the response carries the id to send from then on
+    session_id: Optional[str] = None
+
+class ItineraryRequest(BaseModel):
+    monument_ids: List[str]
+    # Where the day starts; without it, the day starts at the first stop
+    start_latitude: Optional[float] = Field(None, allow_inf_nan=False)
+    start_longitude: Optional[float] = Field(None, allow_inf_nan=False)
+    start_time: str = "09:00"
+    # Weekday name (opening hours differ by day); today if omitted
+    day: Optional[str] = None
+    time_budget_hours: float = Field(8.0, allow_inf_nan=False)
 
 class ChatRequest(BaseModel):
     user_message: str
-    user_latitude: float
-    user_longitude: float
+    user_latitude: float = Field(..., allow_inf_nan=False)
+    user_longitude: float = Field(..., allow_inf_nan=False)
+
+# Maximum number of location queries accepted in one batch request
+MAX_BATCH_QUERIES = 1000
+
+# Maximum monuments in one itinerary request
+MAX_ITINERARY_STOPS = 20
+
+# Nearby monuments a chat answer can use (prompt, rule engine, response context)
+CHAT_CONTEXT_MONUMENTS = 3
+# Passages retrieved from the region's monument text for each chat question
+CHAT_RETRIEVED_PASSAGES = 3
 
 # Utility functions
-def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+def get_nearby_monuments(lat: float, lon: float, radius_km: float,
+                         snapshot: Optional[DataSnapshot] = None,
+                         limit: Optional[int] = None) -> List[dict]:
     """
-    Calculate the great circle distance between two points on Earth in kilometers
+    Get monuments within specified radius, sorted by distance
+    (only the closest `limit` are copied and returned, if given)
     """
-    # Convert latitude and longitude from degrees to radians
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-    
-    # Haversine formula
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
+    snapshot = snapshot or DATA_STORE.snapshot
+    nearby = []
     
-    # Earth's radius in kilometers
-    earth_radius = 6371
+    # Index returns matches already sorted by distance (closest first)
+    with stage_timer("nearby_lookup"):
+        matches = snapshot.within(lat, lon, radius_km)
     
-    # Calculate the distance
-    distance = earth_radius * c
+    for distance, monument in matches[:limit]:
+        monument_copy = monument.copy()
+        monument_copy['distance_km'] = distance
+        nearby.append(monument_copy)
     
-    return round(distance, 2)
+    return nearby
 
-def get_nearby_monuments(lat: float, lon: float, radius_km: float) -> List[dict]:
+def get_nearby_monuments_batch(queries: List[LocationRequest],
+                               snapshot: Optional[DataSnapshot] = None) -> List[List[Tuple[float, dict]]]:
     """
-    Get monuments within specified radius, sorted by distance
+    Get (distance_km, monument) matches for many locations in one vectorized
+    pass per region
     """
-    nearby = []
+    snapshot = snapshot or DATA_STORE.snapshot
+    with stage_timer("nearby_lookup_batch"):
+        return snapshot.within_many(
+            [(q.latitude, q.longitude, q.radius_km) for q in queries]
+        )
+
+def parse_fields_param(fields: Optional[str],
+                       source: Union[MonumentStore, CatalogueResponses]) -> Optional[Tuple[str, ...]]:
+    """
+    fields= projection (None means every field), validated against the
+    fields source knows of: the monument store for nearby results, the
+    catalogue for catalogue pages
+    """
+    field_list = parse_fields(fields)
+    if field_list:
+        unknown = source.unknown_fields(field_list)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(unknown)}")
+    return field_list
+
+def splice_json(head: dict, key: str, encoded_list: bytes) -> bytes:
+    """
+    Encode head with an already-encoded JSON array appended as its last member
+    """
+    return encode_json(dict(head, **{key: []}))[:-3] + encoded_list + b"}"
+
+def get_safety_tips(lat: float, lon: float, snapshot: Optional[DataSnapshot] = None) -> List[str]:
+    """
+    Get relevant safety tips based on location
+    """
+    snapshot = snapshot or DATA_STORE.snapshot
     
-    for monument in MONUMENTS:
-        distance = haversine_distance(lat, lon, monument['latitude'], monument['longitude'])
-        
-        if distance <= radius_km:
-            monument_copy = monument.copy()
-            monument_copy['distance_km'] = distance
-            nearby.append(monument_copy)
+    # General tips plus those of every safety zone containing the point, de-duplicated
+    return list(snapshot.shard_at(lat, lon).safety.tips_at(lat, lon))
+
+def get_location_context(nearby_monuments: List[dict]) -> dict:
+    """
+    Describe where the user is, based on the nearest monument
+    """
+    current_location = "Unknown"
+    distance_km = None
     
-    # Sort by distance (closest first)
-    nearby.sort(key=lambda x: x['distance_km'])
+    if nearby_monuments:
+        nearest = nearby_monuments[0]
+        current_location = nearest['name']
+        distance_km = nearest['distance_km']
     
-    return nearby
+    return {
+        "current_location": current_location,
+        "distance_km": distance_km
+    }
 
-def get_safety_tips(lat: float, lon: float) -> List[str]:
+def sse_event(event: str, data: dict) -> str:
     """
-    Get relevant safety tips based on location
+    Format one server-sent event
     """
-    tips = []
-    
-    # Add general tips
-    tips.extend(SAFETY_DATA.get('general_tips', []))
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def encoded_json_response(request: Request, encoded: EncodedBody) -> Response:
+    """
+    Serve a pre-encoded JSON body, honouring If-None-Match and Accept-Encoding
+    """
+    headers = {
+        "ETag": encoded.etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "public, max-age=60"
+    }
     
-    # Add area-specific tips
-    for area in SAFETY_DATA.get('area_specific', []):
-        area_distance = haversine_distance(
-            lat, lon, 
-            area['latitude'], area['longitude']
-        )
-        
-        if area_distance <= area['radius_km']:
-            tips.extend(area.get('tips', []))
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, encoded.etag):
+        return Response(status_code=304, headers=headers)
     
-    # Remove duplicates while preserving order
-    unique_tips = []
-    for tip in tips:
-        if tip not in unique_tips:
-            unique_tips.append(tip)
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
     
-    return unique_tips
+    return Response(
+        content=encoded.variant(encoding),
+        media_type="application/json",
+        headers=headers
+    )
 
 # API Endpoints
 @app.get("/")
@@ -141,132 +336,500 @@ async def health_check():
     """
     Health check endpoint
     """
-    from datetime import datetime
+    snapshot = DATA_STORE.snapshot
     return {
         "status": "healthy",
-        "monuments_loaded": len(MONUMENTS),
+        "monuments_loaded": len(snapshot.monuments),
+        "data_version": snapshot.version,
+        "data_loaded_at": snapshot.loaded_at,
+        "data_source": snapshot.source,
+        "regions": {shard.region.id: len(shard.monuments) for shard in snapshot.shards},
+        "chat_cache": RESPONSE_CACHE.stats(),
+        "groq_circuit": GROQ_BREAKER.stats(),
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics: request latency per route, per-stage timings,
+    chat answer sources (Groq success/failure, fallback, cache) and cache hit ratios
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/profile")
+async def profile(reset: bool = False):
+    """
+    Collapsed stacks from the sampling profiler (enable with DISHA_PROFILER_INTERVAL_MS)
+    """
+    if PROFILER is None:
+        raise HTTPException(status_code=404, detail="Profiler disabled; set DISHA_PROFILER_INTERVAL_MS")
+    return PlainTextResponse(PROFILER.collapsed(reset=reset))
+
 @app.post("/api/check-location")
-async def check_location(request: LocationRequest):
+async def check_location(
+    request: LocationRequest,
+    fields: Optional[str] = Query(None, description="Monument fields to return: 'summary' (id, name, category, coordinates) or a comma-separated list")
+):
     """
     Find monuments near the given location
     """
-    nearby_monuments = get_nearby_monuments(
-        request.latitude, 
-        request.longitude, 
-        request.radius_km
-    )
+    snapshot = DATA_STORE.snapshot
+    field_list = parse_fields_param(fields, snapshot.monument_store)
     
-    return {
+    # Index returns matches already sorted by distance (closest first)
+    with stage_timer("nearby_lookup"):
+        matches = snapshot.within(request.latitude, request.longitude, request.radius_km)
+    
+    head = {
         "success": True,
         "location": {
             "latitude": request.latitude,
             "longitude": request.longitude,
             "radius_km": request.radius_km
         },
-        "monuments_found": len(nearby_monuments),
-        "monuments": nearby_monuments
+        "monuments_found": len(matches)
+    }
+    if field_list:
+        head["fields"] = list(field_list)
+    
+    # Monuments are spliced in pre-encoded, without copying them
+    body = splice_json(head, "monuments", snapshot.monument_store.encode_nearby(matches, field_list))
+    return Response(content=body, media_type="application/json")
+
+@app.post("/api/check-location/batch")
+async def check_location_batch(
+    request: BatchLocationRequest,
+    fields: Optional[str] = Query(None, description="Monument fields to return: 'summary' or a comma-separated list")
+):
+    """
+    Find monuments near many locations at once (e.g. GPS fixes coalesced by a gateway)
+    """
+    if len(request.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many queries in batch (max {MAX_BATCH_QUERIES})"
+        )
+    
+    snapshot = DATA_STORE.snapshot
+    field_list = parse_fields_param(fields, snapshot.monument_store)
+    batch_results = get_nearby_monuments_batch(request.queries, snapshot)
+    
+    results = []
+    for query, matches in zip(request.queries, batch_results):
+        result_head = {
+            "location": {
+                "latitude": query.latitude,
+                "longitude": query.longitude,
+                "radius_km": query.radius_km
+            },
+            "monuments_found": len(matches)
+        }
+        results.append(splice_json(result_head, "monuments", snapshot.monument_store.encode_nearby(matches, field_list)))
+    
+    head = {
+        "success": True,
+        "queries": len(results)
     }
+    if field_list:
+        head["fields"] = list(field_list)
+    
+    body = splice_json(head, "results", b"[" + b",".join(results) + b"]")
+    return Response(content=body, media_type="application/json")
+
+@app.post("/api/track")
+async def track_location(request: TrackRequest):
+    """
+    Feed one GPS fix of a tracking session and get back only what changed:
+    monuments and safety zones entered or exited since the previous fix
+    """
+    if request.radius_km <= 0:
+        raise HTTPException(status_code=400, detail="radius_km must be positive")
+    
+    with stage_timer("track_update"):
+        update = TRACKING.update(
+            DATA_STORE.snapshot,
+            request.session_id,
+            request.latitude,
+            request.longitude,
+            request.radius_km
+        )
+    
+    if update["new_session"]:
+        TRACK_UPDATES.inc("new_session")
+    elif update["recomputed"]:
+        TRACK_UPDATES.inc("recomputed")
+    else:
+        TRACK_UPDATES.inc("incremental")
+    
+    return {"success": True, **update}
+
+@app.delete("/api/track/{session_id}")
+async def end_tracking(session_id: str):
+    """
+    End a tracking session (sessions also expire after DISHA_TRACK_SESSION_TTL_SECONDS idle)
+    """
+    if not TRACKING.end(session_id):
+        raise HTTPException(status_code=404, detail="Tracking session not found")
+    return {"success": True}
 
 @app.get("/api/monument/{monument_id}")
-async def get_monument(monument_id: str):
+async def get_monument(monument_id: str, request: Request):
     """
     Get detailed information about a specific monument
     """
-    for monument in MONUMENTS:
-        if monument['id'] == monument_id:
-            return {
-                "success": True,
-                "monument": monument
-            }
+    encoded = DATA_STORE.snapshot.catalogue.monument_bodies.get(monument_id)
+    if encoded is None:
+        raise HTTPException(status_code=404, detail="Monument not found")
+    
+    return encoded_json_response(request, encoded)
+
+@app.get("/api/monument/{monument_id}/audio")
+async def get_monument_audio(monument_id: str):
+    """
+    Redirect to the pre-rendered audio of a monument's audio_script
+    """
+    snapshot = DATA_STORE.snapshot
+    idx = snapshot.monument_store.position.get(monument_id)
+    if idx is None:
+        raise HTTPException(status_code=404, detail="Monument not found")
+    
+    key = AUDIO_CACHE.key_for(snapshot.monuments[idx].get('audio_script'))
+    if key is None:
+        raise HTTPException(status_code=404, detail="No audio rendered for this monument; run build_audio.py")
+    
+    # Short-lived: the script (and so the file it points to) can change on reload
+    return RedirectResponse(
+        f"/api/audio/{key}.{AUDIO_CACHE.extension}",
+        status_code=307,
+        headers={"Cache-Control": "public, max-age=300"}
+    )
+
+@app.get("/api/audio/{filename}")
+async def get_audio(filename: str, request: Request):
+    """
+    Serve a cached audio file by its content key, with Range support
+    """
+    key, _, extension = filename.partition(".")
+    path = AUDIO_CACHE.file_for(key) if extension == AUDIO_CACHE.extension else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    
+    # The key changes whenever the content would, so the file never goes stale
+    headers = {"ETag": f'"{key}"', "Cache-Control": "public, max-age=31536000, immutable"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
     
-    raise HTTPException(status_code=404, detail="Monument not found")
+    return FileResponse(path, media_type=AUDIO_CACHE.media_type, headers=headers)
 
 @app.get("/api/monuments/all")
-async def get_all_monuments():
+async def get_all_monuments(
+    request: Request,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = Query(None, description="Comma-separated monument fields to return (e.g. id,name,latitude,longitude), or 'summary'")
+):
     """
-    Get all available monuments
+    Get all available monuments, optionally paginated and projected to a few fields
     """
-    return {
-        "success": True,
-        "total_monuments": len(MONUMENTS),
-        "monuments": MONUMENTS
-    }
+    catalogue = DATA_STORE.snapshot.catalogue
+    field_list = parse_fields_param(fields, catalogue)
+    
+    return encoded_json_response(request, catalogue.page(offset, limit, field_list))
+
+@app.get("/api/bundle")
+async def get_bundle(request: Request):
+    """
+    Offline bundle: every monument and safety zone, the other safety blocks
+    and a grid index, so the app can answer nearby and safety lookups locally
+    """
+    # Hashing and compressing run once per data version, off the event loop
+    encoded = await run_in_threadpool(BUNDLES.bundle, DATA_STORE.snapshot)
+    return encoded_json_response(request, encoded)
+
+@app.get("/api/bundle/delta")
+async def get_bundle_delta(request: Request, since: str = Query(..., description="Bundle version the app holds")):
+    """
+    Monuments and safety zones added, changed or removed since a bundle
+    version; the full bundle ("full": true) if that version is unknown here
+    """
+    encoded = await run_in_threadpool(BUNDLES.delta, DATA_STORE.snapshot, since)
+    return encoded_json_response(request, encoded)
 
 @app.post("/api/safety-tips")
-async def get_safety_tips_endpoint(request: LocationRequest):
+async def get_safety_tips_endpoint(request: SafetyTipsRequest):
     """
     Get safety tips based on location (uses 1.0 km radius internally)
     """
+    snapshot = DATA_STORE.snapshot
+    shard = snapshot.shard_at(request.latitude, request.longitude)
+    
     # Get nearby monuments for monument-specific warnings
-    nearby_monuments = get_nearby_monuments(request.latitude, request.longitude, 1.0)
+    with stage_timer("nearby_lookup"):
+        nearby_monuments = snapshot.within(request.latitude, request.longitude, 1.0)
     
     # Get location-based safety tips
-    location_tips = get_safety_tips(request.latitude, request.longitude)
+    with stage_timer("safety_zones"):
+        location_tips = shard.safety.tips_at(request.latitude, request.longitude)
     
     # Add monument-specific warnings
     monument_warnings = []
-    for monument in nearby_monuments[:2]:  # Max 2 monuments
-        warnings = monument.get('safety_warnings', [])
-        for warning in warnings:
-            if warning not in monument_warnings:
-                monument_warnings.append(f"{monument['name']}: {warning}")
+    for distance, monument in nearby_monuments[:2]:  # Max 2 monuments
+        monument_warnings.extend(shard.safety.warnings_for(monument))
     
-    all_tips = monument_warnings + location_tips
+    all_tips = monument_warnings + list(location_tips)
     
-    return {
+    response = {
         "success": True,
         "location": {
             "latitude": request.latitude,
             "longitude": request.longitude
         },
         "nearby_monuments": len(nearby_monuments),
-        "safety_tips": all_tips,
-        "emergency_contacts": SAFETY_DATA.get('emergency_contacts', {}),
-        "transportation_scams": SAFETY_DATA.get('transportation_scams', []),
-        "shopping_scams": SAFETY_DATA.get('shopping_scams', [])
+        "safety_tips": all_tips
+    }
+    
+    if request.include_static:
+        response.update({
+            "emergency_contacts": snapshot.safety_data.get('emergency_contacts', {}),
+            "transportation_scams": snapshot.safety_data.get('transportation_scams', []),
+            "shopping_scams": snapshot.safety_data.get('shopping_scams', [])
+        })
+    
+    return response
+
+@app.get("/api/safety/static")
+async def get_static_safety_info(request: Request):
+    """
+    Emergency contacts and scam lists, which don't depend on location
+    """
+    return encoded_json_response(request, DATA_STORE.snapshot.safety_static)
+
+def plan_itinerary(request: ItineraryRequest, snapshot: DataSnapshot) -> dict:
+    """
+    Visiting order, times and skipped monuments for an itinerary request.
+    Raises HTTPException on invalid input.
+    """
+    monument_ids = list(dict.fromkeys(request.monument_ids))
+    if not monument_ids:
+        raise HTTPException(status_code=400, detail="monument_ids must not be empty")
+    if len(monument_ids) > MAX_ITINERARY_STOPS:
+        raise HTTPException(status_code=400, detail=f"Too many monuments in itinerary (max {MAX_ITINERARY_STOPS})")
+    position = snapshot.monument_store.position
+    unknown = [monument_id for monument_id in monument_ids if monument_id not in position]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown monument(s): {', '.join(unknown)}")
+    if (request.start_latitude is None) != (request.start_longitude is None):
+        raise HTTPException(status_code=400, detail="Send both start_latitude and start_longitude, or neither")
+    if request.time_budget_hours <= 0:
+        raise HTTPException(status_code=400, detail="time_budget_hours must be positive")
+    
+    day = (request.day or WEEKDAYS[datetime.now().weekday()]).lower()
+    if day not in WEEKDAYS:
+        raise HTTPException(status_code=400, detail=f"day must be one of {', '.join(WEEKDAYS)}")
+    try:
+        start_minute = parse_clock(request.start_time)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"start_time: {e}")
+    end_minute = start_minute + round(request.time_budget_hours * 60)
+    
+    indexes = [position[monument_id] for monument_id in monument_ids]
+    monuments = [snapshot.monuments[idx] for idx in indexes]
+    weekday = WEEKDAYS.index(day)
+    windows = []
+    for monument in monuments:
+        hours = parse_opening_hours(monument.get('opening_hours'))
+        windows.append(hours[weekday] if hours is not None else None)
+    
+    start_distances = None
+    if request.start_latitude is not None:
+        start_distances = [
+            haversine_distance(request.start_latitude, request.start_longitude, monument['latitude'], monument['longitude'])
+            for monument in monuments
+        ]
+    
+    planner = ItineraryPlanner(
+        snapshot.graph.matrix(indexes),
+        [parse_visit_minutes(monument.get('average_visit_duration')) for monument in monuments],
+        windows,
+        start_minute,
+        end_minute,
+        ITINERARY_SPEED_KMH,
+        start_distances
+    )
+    with stage_timer("itinerary_solve"):
+        order, solver = planner.solve()
+    
+    stops = []
+    total_km = 0.0
+    previous = None
+    for stop, arrive, start, finish in planner.schedule(order):
+        leg_km = planner.distances[previous, stop] if previous is not None else (start_distances[stop] if start_distances else 0.0)
+        total_km += leg_km
+        stops.append({
+            "id": monuments[stop]['id'],
+            "name": monuments[stop]['name'],
+            "arrive": format_clock(arrive),
+            "start": format_clock(start),
+            "leave": format_clock(finish),
+            "travel_km": round(float(leg_km), 2),
+            "travel_minutes": round(planner.travel_minutes(leg_km)),
+            "visit_minutes": planner.visit_minutes[stop]
+        })
+        previous = stop
+    
+    visited = set(order)
+    skipped = [
+        {
+            "id": monuments[stop]['id'],
+            "name": monuments[stop]['name'],
+            "reason": f"closed on {day.title()}" if windows[stop] == () else "doesn't fit the time budget and opening hours"
+        }
+        for stop in range(len(monuments))
+        if stop not in visited
+    ]
+    
+    return {
+        "success": True,
+        "day": day,
+        "start_time": format_clock(start_minute),
+        "end_time": stops[-1]["leave"] if stops else format_clock(start_minute),
+        "time_budget_hours": request.time_budget_hours,
+        "solver": solver,
+        "total_distance_km": round(total_km, 2),
+        "stops": stops,
+        "skipped": skipped
     }
 
+@app.post("/api/itinerary")
+async def create_itinerary(request: ItineraryRequest):
+    """
+    Plan a visiting order for the chosen monuments within a time budget,
+    respecting their opening hours and typical visit lengths
+    """
+    snapshot = DATA_STORE.snapshot
+    # Up to a few ms of CPU for larger sets; keep it off the event loop
+    return await run_in_threadpool(plan_itinerary, request, snapshot)
+
 @app.post("/api/chat")
 async def chat_with_guide(request: ChatRequest):
     """
     Chat with AI tour guide
     """
+    snapshot = DATA_STORE.snapshot
+    shard = snapshot.shard_at(request.user_latitude, request.user_longitude)
+    
     # Get nearby monuments (0.5 km radius for chat context)
     nearby_monuments = get_nearby_monuments(
         request.user_latitude, 
         request.user_longitude, 
-        0.5
+        0.5,
+        snapshot,
+        limit=CHAT_CONTEXT_MONUMENTS
     )
     
-    # Get chat response
-    chat_result = get_chat_response(
+    # Passages about places anywhere in the region that match the question
+    with stage_timer("retrieval"):
+        passages = shard.retrieval.search(request.user_message, CHAT_RETRIEVED_PASSAGES)
+    
+    # Get chat response (awaits the LLM without blocking other requests)
+    chat_result = await get_chat_response_async(
         request.user_message,
         nearby_monuments,
         request.user_latitude,
-        request.user_longitude
+        request.user_longitude,
+        rule_chat=shard.rule_chat,
+        region=shard.region,
+        passages=passages
     )
     
-    # Determine current location context
-    current_location = "Unknown"
-    distance_km = None
-    
-    if nearby_monuments:
-        nearest = nearby_monuments[0]
-        current_location = nearest['name']
-        distance_km = nearest['distance_km']
-    
     return {
         "success": True,
         "response": chat_result["response"],
         "ai_powered": chat_result["ai_powered"],
         "nearby_monuments": nearby_monuments[:3],  # Max 3 for context
-        "context": {
-            "current_location": current_location,
-            "distance_km": distance_km
+        "context": get_location_context(nearby_monuments)
+    }
+
+@app.post("/api/chat/stream")
+async def chat_with_guide_stream(request: ChatRequest):
+    """
+    Chat with AI tour guide, streaming the answer as server-sent events.
+    
+    Events: "context" (nearby monuments, sent first), then one "token" per
+    chunk of the answer, then "done".
+    """
+    snapshot = DATA_STORE.snapshot
+    shard = snapshot.shard_at(request.user_latitude, request.user_longitude)
+    
+    # Get nearby monuments (0.5 km radius for chat context)
+    nearby_monuments = get_nearby_monuments(
+        request.user_latitude, 
+        request.user_longitude, 
+        0.5,
+        snapshot,
+        limit=CHAT_CONTEXT_MONUMENTS
+    )
+    
+    # Passages about places anywhere in the region that match the question
+    with stage_timer("retrieval"):
+        passages = shard.retrieval.search(request.user_message, CHAT_RETRIEVED_PASSAGES)
+    
+    async def event_stream():
+        yield sse_event("context", {
+            "nearby_monuments": nearby_monuments[:3],  # Max 3 for context
+            "context": get_location_context(nearby_monuments)
+        })
+        
+        ai_powered = False
+        async for text, ai_powered in stream_chat_response(
+            request.user_message,
+            nearby_monuments,
+            request.user_latitude,
+            request.user_longitude,
+            rule_chat=shard.rule_chat,
+            region=shard.region,
+            passages=passages
+        ):
+            yield sse_event("token", {"text": text})
+        
+        yield sse_event("done", {"success": True, "ai_powered": ai_powered})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop reverse proxies from buffering the stream
+            "X-Accel-Buffering": "no"
         }
+    )
+
+@app.post("/api/admin/reload")
+async def reload_data(x_admin_token: Optional[str] = Header(None)):
+    """
+    Reload monuments and safety data from disk without restarting.
+    Requires the X-Admin-Token header to match DISHA_ADMIN_TOKEN.
+    Only the worker process handling the request reloads.
+    """
+    # Constant-time comparison, so response times don't reveal the token
+    if not ADMIN_TOKEN or not hmac.compare_digest((x_admin_token or "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    
+    # Build the new snapshot in a worker thread so requests keep being served
+    try:
+        await run_in_threadpool(DATA_STORE.reload, True)
+    except (OSError, ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed, previous data still served: {e}")
+    
+    snapshot = DATA_STORE.snapshot
+    on_data_reload(snapshot)
+    return {
+        "success": True,
+        "data_version": snapshot.version,
+        "monuments_loaded": len(snapshot.monuments),
+        "data_loaded_at": snapshot.loaded_at
     }
 
 # Entry point
@@ -0,0 +1,280 @@
+import bisect
+import sys
+import threading
+import time
+from collections import Counter as _TallyCounter
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond lookups to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(labelnames: Sequence[str], labelvalues: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_label_text(self.labelnames, labels)} {value}" for labels, value in items]
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with optional labels
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}  # labels -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        lines = []
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _label_text(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Gauge:
+    """
+    Gauge whose labelled values are read from a callback at scrape time
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 collect: Callable[[], Dict[Tuple[str, ...], float]]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_label_text(self.labelnames, labels)} {value}"
+            for labels, value in sorted(self.collect().items())
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Prometheus text exposition format (version 0.0.4)
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "disha_request_seconds", "HTTP request latency by route", ["method", "route"]
+))
+REQUESTS_TOTAL = REGISTRY.register(Counter(
+    "disha_requests_total", "HTTP requests by route and status code", ["method", "route", "status"]
+))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "disha_stage_seconds", "Time spent in each stage of request handling", ["stage"]
+))
+CHAT_ANSWERS = REGISTRY.register(Counter(
+    "disha_chat_answers_total",
+    "Chat answers by source: cache_hit, coalesced (joined an identical in-flight Groq call), circuit_open (Groq skipped), groq_success, groq_failure (then fallback), rule_fallback",
+    ["outcome"]
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "disha_llm_tokens_total",
+    "LLM tokens by kind: prompt and completion as reported by Groq, estimated_prompt as budgeted locally",
+    ["kind"]
+))
+TRACK_UPDATES = REGISTRY.register(Counter(
+    "disha_track_updates_total",
+    "GPS fixes on /api/track by kind: new_session, recomputed (candidates rebuilt) or incremental",
+    ["kind"]
+))
+
+
+def register_cache_gauge(name: str, documentation: str, stats: Callable[[], Dict[str, Dict[str, float]]]):
+    """
+    Expose cache statistics as disha_cache_<name>{cache="..."} gauges, where
+    stats() returns {cache_name: {"hits": .., "misses": .., "hit_ratio": ..}}
+    """
+    def collect():
+        values = {}
+        for cache_name, cache_stats in stats().items():
+            values[(cache_name,)] = cache_stats.get(name, 0)
+        return values
+
+    return REGISTRY.register(Gauge(f"disha_cache_{name}", documentation, ["cache"], collect))
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """
+    Time a block of code into disha_stage_seconds{stage=...}
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage)
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording each HTTP request in disha_request_seconds and
+    disha_requests_total, labelled by route template. A request is timed
+    until its last body chunk is sent, so streamed answers count in full;
+    one that raises before responding is counted as a 500.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        elapsed: Optional[float] = None
+
+        async def send_timed(message):
+            nonlocal status, elapsed
+            await send(message)
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.pathsend" or (
+                message["type"] == "http.response.body" and not message.get("more_body", False)
+            ):
+                elapsed = time.perf_counter() - start
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            if elapsed is None:
+                elapsed = time.perf_counter() - start
+            # Label by route template, not the raw path, to keep cardinality bounded
+            # (the router stores the matched route in the shared scope)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(elapsed, scope["method"], route)
+            REQUESTS_TOTAL.inc(scope["method"], route, str(status))
+
+
+class SamplingProfiler:
+    """
+    Opt-in statistical profiler: a background thread snapshots every other
+    thread's Python stack at a fixed interval and tallies them as collapsed
+    stacks ("outer;inner;leaf count"), ready for flamegraph tools.
+    """
+
+    def __init__(self, interval_seconds: float = 0.01, max_depth: int = 64):
+        self.interval_seconds = interval_seconds
+        self.max_depth = max_depth
+        self.samples = _TallyCounter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval_seconds):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                parts = []
+                while frame is not None and len(parts) < self.max_depth:
+                    code = frame.f_code
+                    parts.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                    frame = frame.f_back
+                parts.append(names.get(thread_id, str(thread_id)))
+                stacks.append(";".join(reversed(parts)))
+            with self._lock:
+                self.samples.update(stacks)
+
+    def collapsed(self, reset: bool = False) -> str:
+        with self._lock:
+            lines = [f"{stack} {count}" for stack, count in self.samples.most_common()]
+            if reset:
+                self.samples.clear()
+        return "\n".join(lines) + "\n"
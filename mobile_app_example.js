@@ -1,7 +1,7 @@
 // Example: How a React Native mobile app would use this API
 // This shows what the mobile developer needs to build
 
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { View, Text, Button, Alert } from 'react-native';
 import * as Location from 'expo-location';
 
@@ -65,6 +65,38 @@ const TourGuideApp = () => {
     }
   };
 
+  // 4b. TRACK MOVEMENT: send each GPS fix to /api/track and apply only the
+  // changes (monuments entered / exited) instead of refetching the full list
+  const trackingSession = useRef(null);
+  const trackLocation = async (lat, lon) => {
+    try {
+      const response = await fetch('http://your-api.onrender.com/api/track', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          session_id: trackingSession.current,
+          latitude: lat,
+          longitude: lon,
+          radius_km: 1.0
+        })
+      });
+
+      const data = await response.json();
+      trackingSession.current = data.session_id;
+
+      const entered = data.monuments_entered || [];
+      const exited = new Set(data.monuments_exited || []);
+      setNearbyMonuments((current) => [
+        // A new session means the server forgot us: start from scratch
+        ...(data.new_session ? [] : current.filter((m) => !exited.has(m.id))),
+        ...entered
+      ]);
+
+    } catch (error) {
+      Alert.alert('Error', 'Could not update nearby monuments');
+    }
+  };
+
   // 5. CHAT WITH AI TOUR GUIDE
   const askTourGuide = async (message) => {
     if (!location) {
@@ -111,7 +143,7 @@ const TourGuideApp = () => {
           });
           
           // Auto-check for new monuments as user moves
-          checkNearbyMonuments(
+          trackLocation(
             newLocation.coords.latitude, 
             newLocation.coords.longitude
           );
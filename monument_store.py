@@ -0,0 +1,92 @@
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from catalogue import encode_json
+
+# Fields list endpoints need to show a monument on a map or in a list
+SUMMARY_FIELDS = ("id", "name", "category", "latitude", "longitude")
+
+# Named field sets accepted wherever a fields= projection is
+FIELD_PRESETS = {"summary": SUMMARY_FIELDS}
+
+# Added to every nearby result; not a monument field
+DISTANCE_FIELD = "distance_km"
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Field names from a fields= query value ("summary" or "id,name,..."), or
+    None for every field. 'id' always comes first.
+    """
+    if not fields:
+        return None
+    names = []
+    for name in fields.split(","):
+        name = name.strip()
+        names.extend(FIELD_PRESETS.get(name, (name,) if name else ()))
+    if not names:
+        return None
+    return tuple(dict.fromkeys(["id", *names]))
+
+
+class MonumentStore:
+    """
+    Compact per-monument data for nearby-search responses.
+
+    Instead of copying whole monument dicts per result and serializing them
+    again on every request, each monument is encoded to JSON once (full, and
+    as a summary) and results are spliced together from those bytes with the
+    distance appended. Serialization then costs what is returned, not what
+    the catalogue holds. Memory does too: monuments are read back from these
+    bytes (or mapped from a data pack) rather than kept as dicts.
+    """
+
+    def __init__(self, monuments: Sequence[dict], position: Optional[Dict[str, int]] = None,
+                 item_bytes: Optional[Sequence[bytes]] = None, summary_bytes: Optional[Sequence[bytes]] = None,
+                 field_names: Optional[set] = None):
+        # Prebuilt arguments (from a data pack) skip the pass over every monument
+        self._monuments = monuments
+        self.position: Dict[str, int] = position if position is not None else {
+            monument['id']: idx for idx, monument in enumerate(monuments)
+        }
+        if field_names is None:
+            field_names = set()
+            for monument in monuments:
+                field_names.update(monument)
+        self.field_names = set(field_names) | {DISTANCE_FIELD}
+
+        # Each monument encoded once, in full and as a summary
+        self.item_bytes: Sequence[bytes] = item_bytes if item_bytes is not None else [
+            encode_json(monument) for monument in monuments
+        ]
+        self.summary_bytes: Sequence[bytes] = summary_bytes if summary_bytes is not None else [
+            encode_json({field: monument[field] for field in SUMMARY_FIELDS}) for monument in monuments
+        ]
+
+    def unknown_fields(self, fields: Sequence[str]) -> List[str]:
+        return [field for field in fields if field not in self.field_names]
+
+    def _head(self, idx: int, fields: Optional[Tuple[str, ...]]) -> bytes:
+        """
+        Encoded monument (or its projection) without the closing brace
+        """
+        if fields is None:
+            return self.item_bytes[idx][:-1]
+        if fields == SUMMARY_FIELDS:
+            return self.summary_bytes[idx][:-1]
+        monument = self._monuments[idx]
+        return encode_json({field: monument[field] for field in fields if field in monument})[:-1]
+
+    def encode_nearby(self, matches: Sequence[Tuple[float, dict]],
+                      fields: Optional[Tuple[str, ...]] = None) -> bytes:
+        """
+        JSON array of (distance_km, monument) matches, each monument
+        (optionally projected to fields) followed by its distance_km. Without
+        fields, identical to encoding copies of the monuments with distance_km set.
+        """
+        items = []
+        for distance, monument in matches:
+            head = self._head(self.position[monument['id']], fields)
+            separator = b"," if len(head) > 1 else b""
+            items.append(head + separator + b'"distance_km":' + json.dumps(distance).encode() + b"}")
+        return b"[" + b",".join(items) + b"]"
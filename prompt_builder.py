@@ -0,0 +1,186 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Sequence, Tuple
+
+# {location} is filled in per region; {context_text} per request
+GUIDE_PROMPT_TEMPLATE = """You are a friendly, knowledgeable AI tour guide for {location}. A tourist is standing right in front of a monument and talking to you.
+
+Context - Nearby monuments:{context_text}
+
+Constraints: Reply in under 80 words. Speak naturally as if face-to-face. Use present tense. If you don't know something, say so — do not make up facts. If the tourist asks about pricing or safety, use only the data you have been given."""
+
+
+def system_prompt_template(location: str) -> str:
+    """
+    The system prompt template for a guide in location, still to be
+    formatted with context_text
+    """
+    return GUIDE_PROMPT_TEMPLATE.replace("{location}", location)
+
+
+# Used where no region says otherwise
+SYSTEM_PROMPT_TEMPLATE = system_prompt_template("India")
+
+NO_MONUMENTS_TEXT = "\nNo monuments nearby."
+
+# Retrieved passages follow the nearby monuments under this heading
+PASSAGES_HEADING = "\nOther places that match the question:"
+PASSAGE_LABELS = {"description": "about", "audio_script": "guide", "tips": "tips", "pricing": "prices"}
+
+# Rough tokens per character for English text with Llama-family tokenizers
+CHARS_PER_TOKEN = 4
+# Chat formatting overhead per message (role markers etc.)
+TOKENS_PER_MESSAGE = 4
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (about 4 characters per token); no tokenizer needed
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class PromptBuilder:
+    """
+    Builds the Groq messages for a question and the monuments near the tourist.
+
+    The nearby-monument context block is rendered once per combination of
+    monuments (and the distances shown for them) at every level of detail,
+    from full descriptions down to names only, and cached. Each request then
+    picks the most detailed level that keeps the estimated input tokens
+    (system prompt + question) within input_token_budget. The context block
+    doesn't depend on the template, so regions with their own system prompt
+    share the cache.
+
+    Passages retrieved for the question (see retrieval.PassageIndex) are
+    added after the nearby monuments, best first, within their own
+    retrieval_token_budget; a passage that doesn't fit is cut to the
+    sentences that do.
+    """
+
+    def __init__(self, input_token_budget: int = 300, max_cached: int = 1024,
+                 retrieval_token_budget: int = 120):
+        self.input_token_budget = input_token_budget
+        self.retrieval_token_budget = retrieval_token_budget
+        self.max_cached = max_cached
+        self.hits = 0
+        self.misses = 0
+        self.trimmed = 0
+        self._template_tokens: Dict[str, int] = {}  # template -> estimated tokens without context
+        self._contexts = OrderedDict()  # key -> [(context_text, estimated tokens), ...] most detailed first
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(monuments: Sequence[dict]) -> Tuple:
+        return tuple((monument['id'], f"{monument.get('distance_km', 0):.1f}") for monument in monuments)
+
+    @staticmethod
+    def _render_levels(monuments: Sequence[dict]) -> List[Tuple[str, int]]:
+        if not monuments:
+            return [(NO_MONUMENTS_TEXT, estimate_tokens(NO_MONUMENTS_TEXT))]
+
+        heads = [f"\n- {monument['name']} ({monument.get('distance_km', 0):.1f} km away)" for monument in monuments]
+        sentences = [_SENTENCE_END.split(monument['description'].strip()) for monument in monuments]
+
+        # Full text first (exactly as the description reads), then fewer sentences each, then names only
+        texts = ["".join(f"{head}: {monument['description']}" for head, monument in zip(heads, monuments))]
+        for keep in range(max(len(parts) for parts in sentences) - 1, 0, -1):
+            texts.append("".join(f"{head}: {' '.join(parts[:keep])}" for head, parts in zip(heads, sentences)))
+        texts.append("".join(heads))
+
+        return [(text, estimate_tokens(text)) for text in dict.fromkeys(texts)]
+
+    def _levels(self, monuments: Sequence[dict]) -> List[Tuple[str, int]]:
+        key = self._key(monuments)
+        with self._lock:
+            levels = self._contexts.get(key)
+            if levels is not None:
+                self._contexts.move_to_end(key)
+                self.hits += 1
+                return levels
+            self.misses += 1
+
+        levels = self._render_levels(monuments)
+        with self._lock:
+            self._contexts[key] = levels
+            while len(self._contexts) > self.max_cached:
+                self._contexts.popitem(last=False)
+        return levels
+
+    def _fixed_tokens(self, template: str) -> int:
+        tokens = self._template_tokens.get(template)
+        if tokens is None:
+            tokens = self._template_tokens[template] = (
+                estimate_tokens(template.format(context_text="")) + 2 * TOKENS_PER_MESSAGE
+            )
+        return tokens
+
+    def _passages_text(self, passages: Sequence, monuments: Sequence[dict]) -> Tuple[str, int]:
+        """
+        (text, estimated tokens) of the passages that fit the retrieval budget
+        """
+        # A nearby monument's description is in the context already
+        shown = {monument['id'] for monument in monuments}
+        lines = []
+        tokens = estimate_tokens(PASSAGES_HEADING)
+        for passage in passages:
+            if passage.field == "description" and passage.monument_id in shown:
+                continue
+            head = f"\n- {passage.name} ({PASSAGE_LABELS.get(passage.field, passage.field)}): "
+            sentences = _SENTENCE_END.split(passage.text.strip())
+            for keep in range(len(sentences), 0, -1):
+                line = head + " ".join(sentences[:keep])
+                line_tokens = estimate_tokens(line)
+                if tokens + line_tokens <= self.retrieval_token_budget:
+                    lines.append(line)
+                    tokens += line_tokens
+                    break
+        if not lines:
+            return "", 0
+        return PASSAGES_HEADING + "".join(lines), tokens
+
+    def build(self, user_message: str, monuments: Sequence[dict],
+              template: str = SYSTEM_PROMPT_TEMPLATE, passages: Sequence = ()) -> Tuple[list, int]:
+        """
+        (messages, estimated input tokens) for the question, prompt monuments
+        and retrieved passages, with template (see system_prompt_template) as
+        system prompt
+        """
+        levels = self._levels(monuments)
+        fixed_tokens = self._fixed_tokens(template) + estimate_tokens(user_message)
+
+        # Most detailed level that fits; names only if even that doesn't
+        context_text, context_tokens = levels[-1]
+        for text, tokens in levels:
+            if fixed_tokens + tokens <= self.input_token_budget:
+                context_text, context_tokens = text, tokens
+                break
+        if context_text != levels[0][0]:
+            self.trimmed += 1
+        if passages:
+            passages_text, passages_tokens = self._passages_text(passages, monuments)
+            context_text += passages_text
+            context_tokens += passages_tokens
+
+        messages = [
+            {"role": "system", "content": template.format(context_text=context_text)},
+            {"role": "user", "content": user_message}
+        ]
+        return messages, fixed_tokens + context_tokens
+
+    def clear(self):
+        with self._lock:
+            self._contexts.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._contexts),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "trimmed": self.trimmed
+        }
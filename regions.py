@@ -0,0 +1,172 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from prompt_builder import system_prompt_template
+
+# Answers the rule engine gives where no monument is involved, and the travel
+# hint in its directions answers. Regions override any of them.
+DEFAULT_RULE_TEXTS = {
+    "welcome": "Namaste! Welcome to India. Tell me where you are or what you'd like to explore!",
+    "explore": "Tell me which city you're in and I'll point you to the monuments worth exploring there.",
+    "food": """Food tips:
+• Busy local eateries are usually the freshest and best value
+• Check prices before ordering at tourist spots
+Always choose busy stalls for street food!""",
+    "transport": "Google Maps, Uber, or local transport",
+}
+
+DEFAULT_REGION_ID = "default"
+
+
+class Region:
+    """
+    One city (or other area) served from its own shard of the data, with its
+    own bounding box, system prompt and rule-engine texts
+    """
+
+    def __init__(self, region_id: str, name: str,
+                 bounds: Optional[Tuple[float, float, float, float]] = None,
+                 guide_location: Optional[str] = None, prompt_template: Optional[str] = None,
+                 rules: Optional[Dict[str, str]] = None):
+        self.id = region_id
+        self.name = name
+        # (min_lat, max_lat, min_lon, max_lon); None only for the default region
+        self.bounds = bounds
+        self.prompt_template = prompt_template or system_prompt_template(guide_location or name)
+        self.rule_texts = dict(DEFAULT_RULE_TEXTS, **(rules or {}))
+
+    def contains(self, lat: float, lon: float) -> bool:
+        if self.bounds is None:
+            return False
+        min_lat, max_lat, min_lon, max_lon = self.bounds
+        return min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+
+    def contains_many(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """
+        Boolean mask of the points inside the bounds, same test as contains()
+        """
+        if self.bounds is None:
+            return np.zeros(len(latitudes), dtype=bool)
+        min_lat, max_lat, min_lon, max_lon = self.bounds
+        return (latitudes >= min_lat) & (latitudes <= max_lat) & (longitudes >= min_lon) & (longitudes <= max_lon)
+
+
+# Everything outside every configured region
+DEFAULT_REGION = Region(DEFAULT_REGION_ID, "India")
+
+
+def parse_regions(data: Optional[dict]) -> List[Region]:
+    """
+    Regions from the regions data file (None if there is none), in routing
+    order. Raises ValueError, TypeError or KeyError on malformed data.
+    """
+    if data is None:
+        return []
+    if not isinstance(data, dict) or not isinstance(data.get('regions'), list):
+        raise ValueError("regions file must hold an object with a 'regions' list")
+
+    regions = []
+    seen_ids = {DEFAULT_REGION_ID}
+    for entry in data['regions']:
+        region_id = entry['id']
+        if region_id in seen_ids:
+            raise ValueError(f"duplicate or reserved region id {region_id}")
+        seen_ids.add(region_id)
+
+        box = entry['bounds']
+        bounds = (float(box['min_lat']), float(box['max_lat']), float(box['min_lon']), float(box['max_lon']))
+        if bounds[0] > bounds[1] or bounds[2] > bounds[3]:
+            raise ValueError(f"region {region_id} has min bounds above max bounds")
+
+        prompt_template = entry.get('prompt_template')
+        if prompt_template is not None:
+            if "{context_text}" not in prompt_template:
+                raise ValueError(f"region {region_id} prompt_template must contain {{context_text}}")
+            # Any other braces must be doubled; fail now, not on the first chat
+            prompt_template.format(context_text="")
+
+        rules = entry.get('rules', {})
+        unknown = [key for key in rules if key not in DEFAULT_RULE_TEXTS]
+        if unknown:
+            raise ValueError(f"region {region_id} has unknown rule text(s): {', '.join(unknown)}")
+
+        regions.append(Region(
+            region_id,
+            entry.get('name', region_id),
+            bounds,
+            guide_location=entry.get('guide_location'),
+            prompt_template=prompt_template,
+            rules=rules
+        ))
+    return regions
+
+
+def partition(regions: Sequence[Region], latitudes: np.ndarray, longitudes: np.ndarray) -> List[np.ndarray]:
+    """
+    Indexes of the points that belong to each region, plus (last) those in
+    none of them. A point inside overlapping regions goes to the first one,
+    as RegionRouter.region_index would route it.
+    """
+    unassigned = np.ones(len(latitudes), dtype=bool)
+    parts = []
+    for region in regions:
+        inside = unassigned & region.contains_many(latitudes, longitudes)
+        parts.append(np.flatnonzero(inside))
+        unassigned &= ~inside
+    parts.append(np.flatnonzero(unassigned))
+    return parts
+
+
+def area_point(area: dict) -> Tuple[float, float]:
+    """
+    Point a safety zone is routed by: a circle's centre, or the middle of a
+    polygon's vertices' bounding box
+    """
+    if 'polygon' in area:
+        lats = [vertex[0] for vertex in area['polygon']]
+        lons = [vertex[1] for vertex in area['polygon']]
+        return (min(lats) + max(lats)) / 2, (min(lons) + max(lons)) / 2
+    return area['latitude'], area['longitude']
+
+
+class RegionRouter:
+    """
+    Maps a coordinate to the region whose bounding box contains it (the first
+    one, if boxes overlap), or to the default region. Cities are few, so a
+    check of each box is cheaper than any index over them.
+    """
+
+    def __init__(self, regions: Sequence[Region]):
+        self.regions: List[Region] = list(regions)
+
+    def region_index(self, lat: float, lon: float) -> int:
+        """
+        Position of the region containing the point, len(regions) for the default
+        """
+        for idx, region in enumerate(self.regions):
+            if region.contains(lat, lon):
+                return idx
+        return len(self.regions)
+
+    def region_indexes_near(self, box: Optional[Tuple[float, float, float, float]]) -> List[int]:
+        """
+        Positions of the regions whose bounds intersect box (min_lat, max_lat,
+        min_lon, max_lon), plus len(regions) for the default unless one region
+        holds all of box. None stands for a box too large to test: every region.
+        """
+        if box is None:
+            return list(range(len(self.regions) + 1))
+        min_lat, max_lat, min_lon, max_lon = box
+        found = []
+        covered = False
+        for idx, region in enumerate(self.regions):
+            r_min_lat, r_max_lat, r_min_lon, r_max_lon = region.bounds
+            if min_lat > r_max_lat or max_lat < r_min_lat or min_lon > r_max_lon or max_lon < r_min_lon:
+                continue
+            found.append(idx)
+            covered = covered or (r_min_lat <= min_lat and max_lat <= r_max_lat and
+                                  r_min_lon <= min_lon and max_lon <= r_max_lon)
+        if not covered:
+            found.append(len(self.regions))
+        return found
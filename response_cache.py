@@ -0,0 +1,154 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+# Punctuation and repeated whitespace don't change what the tourist is asking
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(user_message: str) -> str:
+    """
+    Lowercase, strip punctuation and collapse whitespace
+    """
+    message = _PUNCTUATION.sub(" ", user_message.lower())
+    return _WHITESPACE.sub(" ", message).strip()
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of LLM answers with a per-entry TTL.
+
+    Keys combine the normalized question with the ids of the monuments that
+    feed the system prompt (and the region, whose system prompt differs). If
+    persist_path is set, entries are loaded from it at startup and written
+    back by save() (periodically from autosave()), so a restart doesn't
+    start cold. The file records the
+    data version its answers were built from; use_data_version() drops them
+    if the monument data is no longer the same.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 6 * 3600,
+                 persist_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self.hits = 0
+        self.misses = 0
+        # Content hash of the monument data the entries were answered from
+        self.data_version: Optional[str] = None
+        self._entries = OrderedDict()  # key -> (expires_at, response)
+        self._unsaved = 0  # changes since the last save
+        self._lock = threading.Lock()
+        # One writer of persist_path at a time (autosave and shutdown may overlap)
+        self._save_lock = threading.Lock()
+
+        if persist_path:
+            self.load()
+
+    @staticmethod
+    def make_key(user_message: str, prompt_monuments: list, region_id: str = "") -> str:
+        monument_ids = ",".join(monument['id'] for monument in prompt_monuments)
+        key = f"{normalize_message(user_message)}|{monument_ids}"
+        return f"{region_id}|{key}" if region_id else key
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, response: str):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._unsaved += 1
+
+    def use_data_version(self, data_version: Optional[str]):
+        """
+        Drop every entry unless they were answered from this data version
+        (call at startup and after the monument data was reloaded)
+        """
+        with self._lock:
+            if data_version is not None and data_version == self.data_version:
+                return
+            self.data_version = data_version
+            self._entries.clear()
+            self._unsaved += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def load(self):
+        """
+        Load unexpired entries from persist_path (missing or corrupt files are ignored)
+        """
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+
+        now = time.time()
+        with self._lock:
+            self.data_version = saved.get('data_version')
+            for key, expires_at, response in saved.get('entries', []):
+                if expires_at > now:
+                    self._entries[key] = (expires_at, response)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self):
+        """
+        Write entries to persist_path atomically, oldest first
+        """
+        if not self.persist_path:
+            return
+
+        with self._save_lock:
+            with self._lock:
+                entries = [[key, expires_at, response] for key, (expires_at, response) in self._entries.items()]
+                data_version = self.data_version
+                self._unsaved = 0
+
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"data_version": data_version, "entries": entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+
+    async def autosave(self, interval_seconds: float):
+        """
+        Save in a worker thread every interval_seconds if anything changed,
+        keeping file writes off the event loop. Runs until cancelled.
+        """
+        while True:
+            await asyncio.sleep(interval_seconds)
+            if not self._unsaved:
+                continue
+            try:
+                await run_in_threadpool(self.save)
+            except OSError as e:
+                # Entries stay in memory; the next round tries again
+                print(f"Error: Saving cached answers failed - {e}")
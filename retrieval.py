@@ -0,0 +1,235 @@
+import bisect
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Monument text that answers questions, one passage per field per monument
+PASSAGE_FIELDS = ("description", "audio_script", "tips", "pricing")
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Best-scoring passages kept per term. Queries add up at most this many
+# scores per query term, so their cost doesn't grow with the catalogue.
+MAX_POSTINGS_PER_TERM = 256
+# Query terms looked up per question (the rarest are kept)
+MAX_QUERY_TERMS = 16
+# Passages tokenized per vectorized counting pass while building
+BUILD_CHUNK_PASSAGES = 20000
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a about after all also an and any are as at be been but by can could did do does for from had has have
+he her here his how i if in into is it its just me more most my near no not of on or our she so some
+than that the their them then there these they this those to too us was we were what when where which
+who why will with would you your
+""".split())
+
+
+def _stem(word: str) -> str:
+    """
+    Fold simple plurals ("gardens" -> "garden", "stories" -> "story")
+    """
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(word) for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+class _Vocabulary(dict):
+    """
+    word -> term id (-1 for stopwords), numbering new terms as they are
+    seen. Known words are plain dict hits, so the text is mapped in C.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.terms: Dict[str, int] = {}
+
+    def __missing__(self, word: str) -> int:
+        term_id = -1 if word in STOPWORDS else self.terms.setdefault(_stem(word), len(self.terms))
+        self[word] = term_id
+        return term_id
+
+
+def _price(value) -> str:
+    value = str(value)
+    return f"₹{value}" if value.isdigit() else value
+
+
+def passage_text(monument: dict, field: str) -> str:
+    """
+    Text of one of a monument's passages ("" if the monument has no such field)
+    """
+    if field == "tips":
+        return ". ".join(tip.rstrip(".") for tip in monument.get('tips', [])) + ("." if monument.get('tips') else "")
+    if field == "pricing":
+        pricing = monument.get('pricing', {})
+        if not pricing and not monument.get('fair_prices'):
+            return ""
+        parts = [f"Entry fees: Indians {_price(pricing.get('indian', 'N/A'))}, "
+                 f"foreigners {_price(pricing.get('foreigner', 'N/A'))}, "
+                 f"children under 15 {_price(pricing.get('children_under_15', 'N/A'))}."]
+        for service, price in monument.get('fair_prices', {}).items():
+            parts.append(f"{service.replace('_', ' ').capitalize()}: {price}.")
+        return " ".join(parts)
+    return monument.get(field) or ""
+
+
+class Passage:
+    """
+    One retrieved passage: a field of a monument and its BM25 score
+    """
+
+    __slots__ = ("monument_id", "name", "field", "text", "score")
+
+    def __init__(self, monument_id: str, name: str, field: str, text: str, score: float):
+        self.monument_id = monument_id
+        self.name = name
+        self.field = field
+        self.text = text
+        self.score = score
+
+
+class PassageIndex:
+    """
+    BM25 index over the passages of a set of monuments (one region shard).
+
+    Each term's postings hold the passages containing it with their whole
+    BM25 contribution (idf and length normalization included) precomputed,
+    sorted best first and cut to MAX_POSTINGS_PER_TERM. A query adds up the
+    postings of its terms, so it costs at most MAX_QUERY_TERMS *
+    MAX_POSTINGS_PER_TERM additions however large the catalogue is. Scores
+    are exact unless a term appears in more passages than are kept; then
+    passages that rank low on every query term may be missed.
+    """
+
+    def __init__(self, monuments: Sequence[dict], terms: Sequence, indptr: np.ndarray,
+                 postings: np.ndarray, impacts: np.ndarray,
+                 passage_monuments: np.ndarray, passage_fields: np.ndarray):
+        self.monuments = monuments
+        # Sorted vocabulary: str, or UTF-8 bytes when read from a data pack
+        self.terms = terms
+        self.indptr = indptr                        # (terms + 1) uint64
+        self.postings = postings                    # uint32 passage numbers
+        self.impacts = impacts                      # float32 BM25 contributions
+        self.passage_monuments = passage_monuments  # uint32 index into monuments
+        self.passage_fields = passage_fields        # uint8 index into PASSAGE_FIELDS
+        self._term_ids: Optional[Dict[str, int]] = (
+            {term: idx for idx, term in enumerate(terms)} if isinstance(terms, list) else None
+        )
+
+    @classmethod
+    def build(cls, monuments: Sequence[dict]) -> "PassageIndex":
+        vocabulary = _Vocabulary()
+        candidates = [(monument_idx, field_idx) for monument_idx in range(len(monuments))
+                      for field_idx in range(len(PASSAGE_FIELDS))]
+        term_parts, passage_parts, count_parts = [], [], []
+        lengths = np.zeros(len(candidates), dtype=np.int64)
+        for start in range(0, len(candidates), BUILD_CHUNK_PASSAGES):
+            chunk = candidates[start:start + BUILD_CHUNK_PASSAGES]
+            words: List[int] = []
+            sizes = []
+            for monument_idx, field_idx in chunk:
+                text = passage_text(monuments[monument_idx], PASSAGE_FIELDS[field_idx])
+                ids = list(map(vocabulary.__getitem__, _WORD.findall(text.lower())))
+                words.extend(ids)
+                sizes.append(len(ids))
+            # (passage, term) occurrence counts for the chunk in one pass
+            term_ids = np.array(words, dtype=np.int64)
+            passage_ids = np.repeat(np.arange(start, start + len(chunk), dtype=np.int64), sizes)
+            kept = term_ids >= 0
+            pairs, counts = np.unique((passage_ids[kept] << 32) | term_ids[kept], return_counts=True)
+            term_parts.append(pairs & 0xFFFFFFFF)
+            passage_parts.append(pairs >> 32)
+            count_parts.append(counts)
+            lengths[start:start + len(chunk)] = np.bincount(passage_ids[kept] - start, minlength=len(chunk))
+
+        # Passages without a single term are left out; renumber the rest
+        present = lengths > 0
+        number = np.cumsum(present) - 1
+        candidate_array = np.array(candidates, dtype=np.int64).reshape(-1, 2)
+        passage_monuments = candidate_array[present, 0]
+        passage_fields = candidate_array[present, 1]
+        lengths = lengths[present].astype(np.float64)
+
+        # Renumber terms in sorted order so lookups can also bisect
+        terms = sorted(vocabulary.terms)
+        rank = np.zeros(len(terms), dtype=np.int64)
+        rank[[vocabulary.terms[term] for term in terms]] = np.arange(len(terms))
+        term_ids = rank[np.concatenate(term_parts)] if term_parts else np.zeros(0, dtype=np.int64)
+        passage_ids = number[np.concatenate(passage_parts)] if passage_parts else np.zeros(0, dtype=np.int64)
+        counts = np.concatenate(count_parts).astype(np.float64) if count_parts else np.zeros(0)
+
+        passages = len(lengths)
+        document_frequency = np.bincount(term_ids, minlength=len(terms))
+        idf = np.log(1 + (passages - document_frequency + 0.5) / (document_frequency + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / lengths.mean()) if passages else lengths
+        impacts = idf[term_ids] * counts * (BM25_K1 + 1) / (counts + norm[passage_ids])
+
+        # Group by term, best passages first, then keep the head of each group
+        order = np.lexsort((-impacts, term_ids))
+        term_ids, passage_ids, impacts = term_ids[order], passage_ids[order], impacts[order]
+        starts = np.searchsorted(term_ids, np.arange(len(terms)))
+        keep = np.arange(len(term_ids)) - starts[term_ids] < MAX_POSTINGS_PER_TERM
+        kept_counts = np.bincount(term_ids[keep], minlength=len(terms))
+        indptr = np.zeros(len(terms) + 1, dtype=np.uint64)
+        np.cumsum(kept_counts, out=indptr[1:])
+
+        return cls(
+            monuments, terms, indptr,
+            passage_ids[keep].astype(np.uint32), impacts[keep].astype(np.float32),
+            passage_monuments.astype(np.uint32), passage_fields.astype(np.uint8)
+        )
+
+    def _term_id(self, term: str) -> Optional[int]:
+        if self._term_ids is not None:
+            return self._term_ids.get(term)
+        key = term.encode("utf-8")
+        pos = bisect.bisect_left(self.terms, key)
+        return pos if pos < len(self.terms) and self.terms[pos] == key else None
+
+    def search(self, query: str, limit: int = 3) -> List[Passage]:
+        """
+        The best-matching passages for a question, best first
+        """
+        term_ids = [term_id for term_id in map(self._term_id, dict.fromkeys(tokenize(query))) if term_id is not None]
+        if not term_ids:
+            return []
+        # Rarest terms carry the meaning; keep those if the question is long
+        term_ids.sort(key=lambda term_id: self.indptr[term_id + 1] - self.indptr[term_id])
+        slices = [slice(int(self.indptr[term_id]), int(self.indptr[term_id + 1])) for term_id in term_ids[:MAX_QUERY_TERMS]]
+
+        passages, positions = np.unique(np.concatenate([self.postings[part] for part in slices]), return_inverse=True)
+        scores = np.bincount(positions, weights=np.concatenate([self.impacts[part] for part in slices]))
+        if len(scores) > limit:
+            best = np.argpartition(-scores, limit)[:limit]
+        else:
+            best = np.arange(len(scores))
+        # Best first; ties in passage order, so results don't depend on the partition
+        best = sorted(best.tolist(), key=lambda pos: (-scores[pos], passages[pos]))
+
+        results = []
+        for pos in best:
+            passage = int(passages[pos])
+            monument = self.monuments[int(self.passage_monuments[passage])]
+            field = PASSAGE_FIELDS[self.passage_fields[passage]]
+            results.append(Passage(monument['id'], monument['name'], field, passage_text(monument, field),
+                                   round(float(scores[pos]), 4)))
+        return results
+
+    def sections(self) -> Dict[str, np.ndarray]:
+        """
+        Arrays to store in a data pack (the vocabulary goes in separately)
+        """
+        return {
+            "indptr": self.indptr, "postings": self.postings, "impacts": self.impacts,
+            "passage_monuments": self.passage_monuments, "passage_fields": self.passage_fields
+        }
@@ -0,0 +1,103 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class BrokenFlight(Exception):
+    """
+    The answer stopped partway through (e.g. the LLM stream broke after some tokens)
+    """
+
+
+class Flight:
+    """
+    One in-flight answer that any number of requests can wait on, either for
+    the whole text (result) or chunk by chunk as it is produced (follow).
+    """
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.ok = False
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        # Wake everyone waiting on the current event, then arm a fresh one
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def push(self, text: str):
+        self.chunks.append(text)
+        self._notify()
+
+    def finish(self, ok: bool):
+        """
+        Mark the answer complete (ok) or failed; failing after some chunks
+        were pushed means the answer was cut short
+        """
+        self.done = True
+        self.ok = ok
+        self._notify()
+
+    async def result(self) -> Optional[str]:
+        """
+        The whole answer, or None if it failed
+        """
+        while not self.done:
+            await self._changed.wait()
+        return "".join(self.chunks) if self.ok else None
+
+    async def follow(self) -> AsyncIterator[str]:
+        """
+        Yield chunks from the first one on, as they arrive. Yields nothing if
+        the answer failed before any chunk, and raises BrokenFlight if it
+        failed after some.
+        """
+        sent = 0
+        while True:
+            changed = self._changed
+            while sent < len(self.chunks):
+                yield self.chunks[sent]
+                sent += 1
+            if self.done:
+                break
+            await changed.wait()
+
+        if not self.ok and sent:
+            raise BrokenFlight()
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent work by key: the first caller starts it in a
+    background task, and everyone asking for the same key while it runs
+    joins the same Flight. The task is not tied to any one request, so a
+    client disconnecting doesn't cancel the answer for the others.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def join(self, key: str, start: Callable[[Flight], Awaitable[None]]) -> Tuple[Flight, bool]:
+        """
+        (flight, started) - started is True if this call started the work.
+        start(flight) must push the answer into the flight and finish it.
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            return flight, False
+
+        flight = self._flights[key] = Flight()
+        flight.task = asyncio.create_task(self._run(key, flight, start))
+        return flight, True
+
+    async def _run(self, key: str, flight: Flight, start: Callable[[Flight], Awaitable[None]]):
+        try:
+            await start(flight)
+        finally:
+            if not flight.done:
+                flight.finish(ok=False)
+            del self._flights[key]
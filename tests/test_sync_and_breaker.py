@@ -0,0 +1,99 @@
+import copy
+import json
+import os
+
+import pytest
+
+from bundle import BundleExporter
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from data_store import DataSnapshot
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _read(name):
+    with open(os.path.join(ROOT, name), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def data():
+    return _read('monuments_data.json'), _read('safety_data.json')
+
+
+def _decode(encoded):
+    return json.loads(bytes(encoded.body))
+
+
+def test_delta_across_a_removed_and_readded_monument(data):
+    monuments, safety_data = data
+    removed_id, edited_id = monuments[0]['id'], monuments[1]['id']
+
+    v1 = DataSnapshot(copy.deepcopy(monuments), safety_data, 1)
+    v2 = DataSnapshot(copy.deepcopy(monuments[1:]), safety_data, 2)
+    v3_monuments = copy.deepcopy(monuments)
+    v3_monuments[1]['description'] += " Edited."
+    v3 = DataSnapshot(v3_monuments, safety_data, 3)
+
+    exporter = BundleExporter()
+    v1_version = _decode(exporter.bundle(v1))['version']
+    v2_delta = _decode(exporter.delta(v2, v1_version))
+    assert v2_delta['removed_monuments'] == [removed_id]
+    assert v2_delta['monuments'] == []
+    v2_version = v2_delta['version']
+
+    # Back in v3 unchanged, so a v1 client has nothing to fetch for it
+    v1_delta = _decode(exporter.delta(v3, v1_version))
+    assert v1_delta['full'] is False
+    assert v1_delta['removed_monuments'] == []
+    assert [monument['id'] for monument in v1_delta['monuments']] == [edited_id]
+
+    # A v2 client dropped it and gets it back
+    v2_delta = _decode(exporter.delta(v3, v2_version))
+    assert v2_delta['removed_monuments'] == []
+    assert sorted(monument['id'] for monument in v2_delta['monuments']) == sorted([removed_id, edited_id])
+
+
+def test_delta_from_unknown_version_is_full_bundle(data):
+    monuments, safety_data = data
+    snapshot = DataSnapshot(copy.deepcopy(monuments), safety_data, 1)
+    exporter = BundleExporter()
+
+    delta = exporter.delta(snapshot, "not-a-version")
+    assert delta is exporter.bundle(snapshot)
+    body = _decode(delta)
+    assert body['full'] is True
+    assert len(body['monuments']) == len(monuments)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_half_opens_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, window_seconds=30, open_seconds=10, clock=clock)
+
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.retry_in() == 10
+
+    clock.now = 10
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+    assert breaker.stats()["times_opened"] == 1
@@ -0,0 +1,181 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from geo_index import ROUNDING_SLACK_KM, haversine_distance
+
+
+class TrackingSession:
+    """
+    What the server remembers about one tourist between GPS fixes
+    """
+
+    __slots__ = ("session_id", "expires_at", "version", "region_id", "radius_km", "anchor", "cell",
+                 "candidates", "monument_ids", "zone_names")
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.expires_at = 0.0
+        self.version: Optional[int] = None
+        self.region_id: Optional[str] = None
+        self.radius_km = 0.0
+        # Point the candidate set was computed around, and its grid cell
+        self.anchor: Optional[Tuple[float, float]] = None
+        self.cell: Optional[Tuple[int, int]] = None
+        # Monuments close enough to the anchor that they may be in range at any
+        # point within the move threshold of it
+        self.candidates: List[dict] = []
+        # Monument ids / safety zone names the client was last told about
+        self.monument_ids: Dict[str, None] = {}
+        self.zone_names: Dict[str, None] = {}
+
+
+class TrackingSessions:
+    """
+    Incremental nearby-monument and safety-zone tracking for a stream of GPS
+    fixes per session.
+
+    For each session the candidate monuments around an anchor point are kept
+    with a margin of move_threshold_km. While the tourist stays in the same
+    grid cell and within the threshold of the anchor, a fix only re-checks
+    those few candidates; anything in range of the new point is guaranteed to
+    be among them. Crossing a cell boundary or into another region, moving
+    further, changing radius or a data reload recomputes the candidates from
+    the spatial indexes of every region the search circle reaches.
+
+    Each update returns only what changed since the previous fix: monuments
+    and zones entered and exited.
+    """
+
+    def __init__(self, move_threshold_km: float = 0.05, ttl_seconds: float = 1800,
+                 max_sessions: int = 10000):
+        self.move_threshold_km = move_threshold_km
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, TrackingSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _session(self, session_id: Optional[str]) -> Tuple[TrackingSession, bool]:
+        """
+        The live session for session_id, or a new one (second value True)
+        """
+        now = time.time()
+        session = self._sessions.get(session_id) if session_id else None
+        if session is not None and session.expires_at >= now:
+            self._sessions.move_to_end(session.session_id)
+            session.expires_at = now + self.ttl_seconds
+            return session, False
+
+        if session is not None:
+            del self._sessions[session.session_id]
+        # Always issue ids server-side, so clients can't pick each other's
+        session = TrackingSession(secrets.token_urlsafe(16))
+        session.expires_at = now + self.ttl_seconds
+        self._sessions[session.session_id] = session
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return session, True
+
+    def _needs_recompute(self, session: TrackingSession, snapshot, shard, lat: float, lon: float,
+                         radius_km: float, cell: Tuple[int, int]) -> bool:
+        if session.anchor is None or session.version != snapshot.version:
+            return True
+        if session.region_id != shard.region.id:
+            return True
+        if session.radius_km != radius_km or session.cell != cell:
+            return True
+        moved_km = haversine_distance(lat, lon, session.anchor[0], session.anchor[1])
+        return moved_km > self.move_threshold_km
+
+    def update(self, snapshot, session_id: Optional[str], lat: float, lon: float,
+               radius_km: float) -> dict:
+        """
+        Apply one GPS fix. Returns the session id, whether the session is new
+        (the client should drop whatever state it had), whether the candidate
+        set was recomputed, and the monuments and zones entered and exited
+        (each delta list only when non-empty).
+        """
+        with self._lock:
+            session, is_new = self._session(session_id)
+
+            shard = snapshot.shard_at(lat, lon)
+            cell = shard.monument_index.cell(lat, lon)
+            recomputed = self._needs_recompute(session, snapshot, shard, lat, lon, radius_km, cell)
+            if recomputed:
+                # Distances are rounded before the radius check, hence the slack
+                margin_km = self.move_threshold_km + ROUNDING_SLACK_KM
+                # From every shard the circle reaches, not just the one holding the point
+                session.candidates = [
+                    monument
+                    for _, monument in snapshot.within(lat, lon, radius_km + margin_km)
+                ]
+                session.anchor = (lat, lon)
+                session.cell = cell
+                session.radius_km = radius_km
+                session.version = snapshot.version
+                session.region_id = shard.region.id
+
+            # Same check as GeoGridIndex.within, over the candidates only
+            in_range = []
+            for monument in session.candidates:
+                distance = haversine_distance(lat, lon, monument['latitude'], monument['longitude'])
+                if distance <= radius_km:
+                    in_range.append((distance, monument))
+            in_range.sort(key=lambda pair: pair[0])
+
+            areas = shard.safety.geofences.areas
+            zones = [areas[idx] for idx in shard.safety.geofences.areas_at(lat, lon)]
+
+            monument_ids = dict.fromkeys(monument['id'] for _, monument in in_range)
+            zone_names = dict.fromkeys(zone.get('area_name', '') for zone in zones)
+
+            entered = [
+                {
+                    "id": monument['id'],
+                    "name": monument['name'],
+                    "category": monument['category'],
+                    "distance_km": distance
+                }
+                for distance, monument in in_range
+                if monument['id'] not in session.monument_ids
+            ]
+            exited = [monument_id for monument_id in session.monument_ids if monument_id not in monument_ids]
+            zones_entered = [
+                {"area_name": zone.get('area_name', ''), "tips": zone.get('tips', [])}
+                for zone in zones
+                if zone.get('area_name', '') not in session.zone_names
+            ]
+            zones_exited = [name for name in session.zone_names if name not in zone_names]
+
+            session.monument_ids = monument_ids
+            session.zone_names = zone_names
+
+        nearest = None
+        if in_range:
+            nearest = {"id": in_range[0][1]['id'], "distance_km": in_range[0][0]}
+
+        update = {
+            "session_id": session.session_id,
+            "new_session": is_new,
+            "recomputed": recomputed,
+            "monuments_in_range": len(monument_ids),
+            "nearest": nearest
+        }
+        # Most fixes change nothing; leave empty deltas out of the payload
+        deltas = {
+            "monuments_entered": entered,
+            "monuments_exited": exited,
+            "zones_entered": zones_entered,
+            "zones_exited": zones_exited
+        }
+        update.update((key, value) for key, value in deltas.items() if value)
+        return update
+
+    def end(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None